@@ -0,0 +1,191 @@
+import errno
+import hashlib
+import json
+import logging
+import os
+import shutil
+import zlib
+
+CHUNK_SIZE = 16 * 1024 * 1024
+# Через сколько блоков данные и журнал сбрасываются на носитель
+SYNC_CHUNKS = 8
+JOURNAL_SUFFIX = '.transfer'
+PART_SUFFIX = '.part'
+
+
+def part_path(target):
+    directory, name = os.path.split(target)
+    return os.path.join(directory, f'.{name}{PART_SUFFIX}')
+
+
+class ChunkedTransfer:
+    # Передача файла блоками: данные пишутся в скрытый .part рядом с целью, а журнал хранится
+    # в journal_directory вне устройства. Первая строка журнала описывает источник и цель,
+    # каждая следующая - записанный блок с его CRC32 и накопленной CRC32 файла. Блоки
+    # попадают в журнал пачками по sync_chunks, только после fsync их данных.
+    # После обрыва передача продолжается с последнего блока, прошедшего проверку в _load
+    def __init__(self, journal_directory, chunk_size=CHUNK_SIZE, sync_chunks=SYNC_CHUNKS, verify=False):
+        self.journal_directory = journal_directory
+        self.chunk_size = chunk_size
+        self.sync_chunks = sync_chunks
+        # Перечитывать каждую пачку с носителя после fsync: вдвое больше чтения, зато
+        # ошибка записи обнаруживается сразу, а не при продолжении передачи
+        self.verify = verify
+
+    def journal_path(self, target):
+        digest = hashlib.blake2b(os.fsencode(target), digest_size=16).hexdigest()
+        return os.path.join(self.journal_directory, digest + JOURNAL_SUFFIX)
+
+    def copy_file(self, source, target, progress=None, checkpoint=None):
+        progress = progress or (lambda nbytes, nfiles: None)
+        stat = os.stat(source)
+        header = {'source': source, 'target': target, 'size': stat.st_size,
+                  'mtime_ns': stat.st_mtime_ns, 'chunk_size': self.chunk_size}
+        part = part_path(target)
+        chunks = self._load(target, header, part)
+        done = len(chunks) * self.chunk_size
+        rolling = chunks[-1]['rolling'] if chunks else 0
+        if chunks:
+            logging.info(f"Продолжение передачи {source} -> {target} с {done} байт")
+            progress(min(done, stat.st_size), 0)
+
+        os.makedirs(self.journal_directory, exist_ok=True)
+        try:
+            with open(source, 'rb') as src, open(part, 'r+b' if chunks else 'w+b') as dst, \
+                    open(self.journal_path(target), 'a' if chunks else 'w', encoding='utf-8') as journal:
+                if not chunks:
+                    self._append(journal, header)
+                number = len(chunks)
+                unsynced = []
+                try:
+                    while done < stat.st_size:
+                        if checkpoint:
+                            checkpoint()
+                        data = os.pread(src.fileno(), self.chunk_size, done)
+                        if not data:
+                            break
+                        os.pwrite(dst.fileno(), data, done)
+                        rolling = zlib.crc32(data, rolling)
+                        unsynced.append({'chunk': number, 'crc': zlib.crc32(data), 'rolling': rolling})
+                        number += 1
+                        done += len(data)
+                        progress(len(data), 0)
+                        if len(unsynced) >= self.sync_chunks:
+                            self._sync(dst.fileno(), journal, unsynced, stat.st_size, target)
+                            unsynced = []
+                    os.ftruncate(dst.fileno(), done)
+                    self._sync(dst.fileno(), journal, unsynced, stat.st_size, target)
+                except OSError:
+                    # Записанное до обрыва сохраняется, если носитель еще доступен
+                    try:
+                        self._sync(dst.fileno(), journal, unsynced, stat.st_size, target)
+                    except OSError:
+                        pass
+                    raise
+            # Блоки прошлого запуска читались из источника тогда: убеждаемся,
+            # что собранный файл совпадает с источником целиком
+            if chunks and self._file_crc(source) != rolling:
+                self.discard(target)
+                raise OSError(errno.EIO, f"Источник {source} изменился во время прерванной передачи")
+        except BaseException as e:
+            # Журнал и недописанный файл остаются для продолжения, кроме отмены пользователем
+            if not isinstance(e, OSError):
+                self.discard(target)
+            raise
+        os.replace(part, target)
+        os.remove(self.journal_path(target))
+        shutil.copystat(source, target)
+        logging.info(f"Передача {source} -> {target} завершена, CRC32 {rolling:08x}")
+        progress(0, 1)
+
+    def _sync(self, fd, journal, records, size, target):
+        os.fsync(fd)
+        if self.verify:
+            for record in records:
+                offset = record['chunk'] * self.chunk_size
+                if self._chunk_crc(fd, offset, min(self.chunk_size, size - offset)) != record['crc']:
+                    raise OSError(errno.EIO, f"Блок {record['chunk']} файла {target} записан с ошибкой")
+        if records:
+            self._append(journal, *records)
+
+    def discard(self, target):
+        for path in (part_path(target), self.journal_path(target)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def pending(self, root):
+        # Незавершенные передачи с целью внутри root: список (источник, цель)
+        transfers = []
+        root = os.path.normpath(root)
+        try:
+            names = os.listdir(self.journal_directory)
+        except FileNotFoundError:
+            return transfers
+        for name in names:
+            if not name.endswith(JOURNAL_SUFFIX):
+                continue
+            try:
+                with open(os.path.join(self.journal_directory, name), encoding='utf-8') as f:
+                    header = json.loads(f.readline())
+                if os.path.commonpath([root, header['target']]) == root:
+                    transfers.append((header['source'], header['target']))
+            except (OSError, ValueError, KeyError):
+                continue
+        return transfers
+
+    def _load(self, target, header, part):
+        # Возвращает записи проверенных блоков или пустой список, если начинать заново
+        try:
+            with open(self.journal_path(target), encoding='utf-8') as f:
+                saved = json.loads(f.readline())
+                chunks = []
+                for line in f:
+                    try:
+                        chunks.append(json.loads(line))
+                    except ValueError:
+                        # Строка, не дописанная в момент обрыва
+                        break
+        except (OSError, ValueError):
+            return []
+        if saved != header or not os.path.exists(part):
+            logging.info(f"Журнал передачи {target} не соответствует источнику, передача начинается заново")
+            return []
+        # Перепроверяется последняя пачка блоков: кэш записи мог не дойти до носителя.
+        # Журнал обрезается на первом блоке, который не совпал
+        with open(part, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            for position in range(max(len(chunks) - self.sync_chunks, 0), len(chunks)):
+                offset = chunks[position]['chunk'] * self.chunk_size
+                length = min(self.chunk_size, header['size'] - offset)
+                if offset + length > size or self._chunk_crc(f.fileno(), offset, length) != chunks[position]['crc']:
+                    del chunks[position:]
+                    break
+        if chunks:
+            # Журнал переписывается, чтобы в нем остались только проверенные блоки
+            with open(self.journal_path(target), 'w', encoding='utf-8') as journal:
+                self._append(journal, header, *chunks)
+        return chunks
+
+    def _chunk_crc(self, fd, offset, length):
+        try:
+            os.posix_fadvise(fd, offset, length, os.POSIX_FADV_DONTNEED)
+        except (AttributeError, OSError):
+            pass
+        return zlib.crc32(os.pread(fd, length, offset))
+
+    def _file_crc(self, path):
+        rolling = 0
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(self.chunk_size)
+                if not data:
+                    return rolling
+                rolling = zlib.crc32(data, rolling)
+
+    def _append(self, journal, *records):
+        for record in records:
+            journal.write(json.dumps(record, ensure_ascii=False) + '\n')
+        journal.flush()
+        os.fsync(journal.fileno())
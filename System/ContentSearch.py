@@ -0,0 +1,140 @@
+import logging
+import mmap
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from TreeWalker import TreeWalker
+
+BINARY_PROBE_SIZE = 8192
+SMALL_FILE_SIZE = 1024 * 1024
+SMALL_BATCH_SIZE = 8 * 1024 * 1024
+MAX_LINE_LENGTH = 200
+
+
+def count_newlines(data, start, end, window):
+    count = 0
+    while start < end:
+        stop = min(start + window, end)
+        count += data[start:stop].count(b'\n')
+        start = stop
+    return count
+
+
+def search_file(path, pattern, window):
+    hits = []
+    try:
+        with open(path, 'rb') as f:
+            # Нулевой байт в начале файла - признак двоичного файла
+            if b'\x00' in f.read(BINARY_PROBE_SIZE):
+                return hits
+            if os.fstat(f.fileno()).st_size == 0:
+                return hits
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                line = 1
+                counted = 0
+                position = data.find(pattern)
+                while position != -1:
+                    line += count_newlines(data, counted, position, window)
+                    line_start = data.rfind(b'\n', 0, position) + 1
+                    line_end = data.find(b'\n', position)
+                    if line_end == -1:
+                        line_end = len(data)
+                    text = data[line_start:min(line_end, line_start + MAX_LINE_LENGTH)]
+                    hits.append((path, line, text.decode('utf-8', errors='replace').strip()))
+                    # Следующее совпадение ищется со следующей строки
+                    counted = line_end
+                    if line_end < len(data):
+                        line += 1
+                        counted += 1
+                    position = data.find(pattern, counted)
+    except (OSError, ValueError):
+        pass
+    return hits
+
+
+def search_files(paths, pattern, window):
+    hits = []
+    for path in paths:
+        hits.extend(search_file(path, pattern, window))
+    return hits
+
+
+class ContentSearch:
+    def __init__(self, max_workers=None, memory_limit=256 * 1024 * 1024, walker=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Потолок суммарного размера файлов, одновременно находящихся в обработке
+        self.memory_limit = memory_limit
+        self.walker = walker or TreeWalker()
+        self.executor = None
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def search(self, root, text, cancel_event):
+        # Генератор результатов (путь, "путь:строка: текст") для SearchService
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+        pattern = text.encode('utf-8')
+        window = max(64 * 1024, min(16 * 1024 * 1024, self.memory_limit // self.max_workers))
+        running = {}
+        in_flight = 0
+
+        try:
+            for paths, size in self.batches(root):
+                if cancel_event.is_set():
+                    break
+                # Ждем, пока суммарный объем задач не опустится ниже потолка
+                while running and in_flight + size > self.memory_limit:
+                    in_flight -= yield from self._collect(root, running, cancel_event)
+                running[self.executor.submit(search_files, paths, pattern, window)] = size
+                in_flight += size
+
+            while running and not cancel_event.is_set():
+                in_flight -= yield from self._collect(root, running, cancel_event)
+        finally:
+            # Также при close() генератора или его сборке мусором
+            for future in running:
+                future.cancel()
+
+    def _collect(self, root, running, cancel_event):
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        released = 0
+        for future in done:
+            released += running.pop(future)
+            try:
+                hits = future.result()
+            except Exception as e:
+                logging.error(f"Ошибка поиска по содержимому: {e}")
+                continue
+            for path, line, text in hits:
+                if cancel_event.is_set():
+                    return released
+                yield path, f"{os.path.relpath(path, root)}:{line}: {text}"
+        return released
+
+    def batches(self, root):
+        # Мелкие файлы объединяются в пачки, крупные обрабатываются по одному
+        small = []
+        small_size = 0
+        for entry in self.walker.files(root):
+            try:
+                size = entry.stat().st_size
+            except OSError:
+                continue
+            if size == 0:
+                continue
+            if size >= SMALL_FILE_SIZE:
+                yield [entry.path], size
+                continue
+            small.append(entry.path)
+            small_size += size
+            if small_size >= SMALL_BATCH_SIZE:
+                yield small, small_size
+                small = []
+                small_size = 0
+        if small:
+            yield small, small_size
@@ -0,0 +1,223 @@
+import errno
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from ChunkedTransfer import ChunkedTransfer
+from TreeWalker import TreeWalker
+
+FICLONE = 0x40049409
+CHUNK_SIZE = 8 * 1024 * 1024
+PREALLOCATE_THRESHOLD = 64 * 1024 * 1024
+# Ошибки, после которых имеет смысл попробовать следующий способ копирования
+FALLBACK_ERRORS = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.ETXTBSY)
+
+
+class CopyEngine:
+    def __init__(self, max_workers=8, walker=None, transfer_journals='.transfers'):
+        self.max_workers = max_workers
+        self.walker = walker or TreeWalker()
+        self.chunked = ChunkedTransfer(transfer_journals)
+
+    def copy_file(self, source, target, progress=None, checkpoint=None, verify=False, resumable=False):
+        # progress(байт, файлов) вызывается по мере копирования, checkpoint() - между блоками
+        progress = progress or (lambda nbytes, nfiles: None)
+        # Открытие цели на запись обнулило бы источник
+        if os.path.exists(target) and os.path.samefile(source, target):
+            raise shutil.SameFileError(f"{source} и {target} - один и тот же файл")
+        if resumable:
+            return self.chunked.copy_file(source, target, progress, checkpoint)
+        if verify:
+            return self.copy_file_verified(source, target, progress, checkpoint)
+        try:
+            with open(source, 'rb') as src, open(target, 'wb') as dst:
+                size = os.fstat(src.fileno()).st_size
+                if not self._reflink(src, dst):
+                    if size >= PREALLOCATE_THRESHOLD:
+                        try:
+                            os.posix_fallocate(dst.fileno(), 0, size)
+                        except OSError:
+                            pass
+                    self._copy_data(src, dst, size, progress, checkpoint)
+                else:
+                    progress(size, 0)
+        except BaseException:
+            # Недокопированный файл не оставляем
+            if os.path.exists(target):
+                os.remove(target)
+            raise
+        shutil.copystat(source, target)
+        progress(0, 1)
+
+    def copy_file_verified(self, source, target, progress=None, checkpoint=None):
+        # Потоковое копирование с подсчетом хеша источника и сверкой записанного файла
+        progress = progress or (lambda nbytes, nfiles: None)
+        source_hash = hashlib.blake2b()
+        try:
+            with open(source, 'rb') as src, open(target, 'wb') as dst:
+                while True:
+                    if checkpoint:
+                        checkpoint()
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    source_hash.update(chunk)
+                    dst.write(chunk)
+                    progress(len(chunk), 0)
+                dst.flush()
+                os.fsync(dst.fileno())
+            if self.file_hash(target, checkpoint) != source_hash.digest():
+                raise OSError(errno.EIO, f"Копия {target} не совпадает с {source}")
+        except BaseException:
+            if os.path.exists(target):
+                os.remove(target)
+            raise
+        shutil.copystat(source, target)
+        progress(0, 1)
+
+    def file_hash(self, path, checkpoint=None):
+        digest = hashlib.blake2b()
+        with open(path, 'rb') as f:
+            while True:
+                if checkpoint:
+                    checkpoint()
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        return digest.digest()
+
+    def copy_tree(self, source, target, progress=None, checkpoint=None, verify=False, resumable=False):
+        progress = progress or (lambda nbytes, nfiles: None)
+        real_source = os.path.realpath(source)
+        if os.path.commonpath([real_source, os.path.realpath(target)]) == real_source:
+            raise OSError(errno.EINVAL, f"Нельзя скопировать папку {source} внутрь самой себя: {target}")
+        lock = threading.Lock()
+
+        def locked_progress(nbytes, nfiles):
+            with lock:
+                progress(nbytes, nfiles)
+
+        os.makedirs(target, exist_ok=True)
+        directories = [(source, target)]
+
+        def tasks():
+            for entry in self.walker.walk(source):
+                if checkpoint:
+                    checkpoint()
+                destination = os.path.join(target, os.path.relpath(entry.path, source))
+                if entry.is_symlink():
+                    os.symlink(os.readlink(entry.path), destination)
+                    locked_progress(0, 1)
+                elif entry.is_dir():
+                    # Обходчик отдает папку раньше ее содержимого
+                    os.makedirs(destination, exist_ok=True)
+                    directories.append((entry.path, destination))
+                else:
+                    yield (self.copy_file, entry.path, destination, locked_progress, checkpoint, verify, resumable)
+
+        self._run_parallel(tasks())
+        # Время изменения папок выставляется после того, как в них все записано
+        for directory, destination in reversed(directories):
+            shutil.copystat(directory, destination)
+
+    def copy_many(self, pairs, progress=None, checkpoint=None, verify=False, resumable=False):
+        # Копирует несколько пар (источник, цель) одного задания: файлы идут в общий пул,
+        # как содержимое папки в copy_tree, папки копируются через copy_tree
+        progress = progress or (lambda nbytes, nfiles: None)
+        lock = threading.Lock()
+
+        def locked_progress(nbytes, nfiles):
+            with lock:
+                progress(nbytes, nfiles)
+
+        def tasks():
+            for source, target in pairs:
+                if checkpoint:
+                    checkpoint()
+                if os.path.islink(source):
+                    os.symlink(os.readlink(source), target)
+                    locked_progress(0, 1)
+                elif os.path.isdir(source):
+                    self.copy_tree(source, target, locked_progress, checkpoint, verify, resumable)
+                else:
+                    yield (self.copy_file, source, target, locked_progress, checkpoint, verify, resumable)
+
+        self._run_parallel(tasks())
+
+    def _run_parallel(self, tasks):
+        # Выполняет задачи (функция, аргументы...) в пуле; мелкие файлы копируются параллельно,
+        # в работе не больше 4 * max_workers
+        running = set()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='copy')
+        try:
+            for task in tasks:
+                if len(running) >= self.max_workers * 4:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                running.add(executor.submit(*task))
+            for future in running:
+                future.result()
+        finally:
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _reflink(self, src, dst):
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return True
+        except OSError:
+            return False
+
+    def _copy_data(self, src, dst, size, progress, checkpoint):
+        copied = self._copy_kernel(src, dst, size, progress, checkpoint)
+        if copied < size:
+            logging.info(f"Копирование через буфер: {src.name}")
+            src.seek(copied)
+            dst.seek(copied)
+            while True:
+                if checkpoint:
+                    checkpoint()
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                dst.write(chunk)
+                copied += len(chunk)
+                progress(len(chunk), 0)
+            dst.flush()
+        # Отрезаем хвост предвыделенного места, если файл успел уменьшиться
+        os.ftruncate(dst.fileno(), copied)
+
+    def _copy_kernel(self, src, dst, size, progress, checkpoint):
+        # Копирование внутри ядра: copy_file_range, при неудаче - sendfile
+        copied = 0
+        for method in (self._copy_file_range, self._sendfile):
+            try:
+                while copied < size:
+                    if checkpoint:
+                        checkpoint()
+                    sent = method(src.fileno(), dst.fileno(), copied, min(CHUNK_SIZE, size - copied))
+                    if sent == 0:
+                        break
+                    copied += sent
+                    progress(sent, 0)
+                return copied
+            except OSError as e:
+                if e.errno not in FALLBACK_ERRORS:
+                    raise
+        return copied
+
+    def _copy_file_range(self, src_fd, dst_fd, offset, count):
+        if not hasattr(os, 'copy_file_range'):
+            raise OSError(errno.ENOSYS, 'copy_file_range недоступен')
+        return os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+
+    def _sendfile(self, src_fd, dst_fd, offset, count):
+        os.lseek(dst_fd, offset, os.SEEK_SET)
+        return os.sendfile(dst_fd, src_fd, offset, count)
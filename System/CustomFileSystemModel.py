@@ -1,26 +1,73 @@
 import logging
 import os
 from PyQt5.QtWidgets import QFileSystemModel
-from PyQt5.QtCore import Qt, QFileInfo
+from PyQt5.QtCore import Qt
+
+from DirectorySizeEngine import DirectorySizeEngine
+from DirectorySizeIndex import DirectorySizeIndex
 
 logging.basicConfig(filename='super_app.log', level=logging.INFO, format='%(asctime)s - %(message)s')
 
 
 class CustomFileSystemModel(QFileSystemModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.size_engine = DirectorySizeEngine(index=DirectorySizeIndex('directory_sizes.db'), parent=self)
+        self.size_engine.sizeReady.connect(self.onDirectorySizeReady)
+
+    def setRootPath(self, path):
+        # Сброс модели означает, что содержимое могло измениться где угодно
+        if not path:
+            self.size_engine.clear()
+        return super().setRootPath(path)
+
+    def refreshPaths(self, paths, recursive=()):
+        # Обновляет только затронутые папки вместо полного сброса модели:
+        # раскрытые узлы, выделение и кэш остального дерева сохраняются.
+        # Для путей из recursive дополнительно сбрасываются размеры всего поддерева
+        directories = set()
+        for path in paths:
+            path = os.path.normpath(path)
+            if path in recursive:
+                self.size_engine.invalidate(path)
+            directories.add(os.path.dirname(path))
+            if os.path.exists(path):
+                # index() для еще неизвестного пути заставляет модель загрузить его
+                self.index(path)
+                if os.path.isdir(path):
+                    directories.add(path)
+        for directory in directories:
+            self.size_engine.applyChange(directory)
+            parent = self.index(directory)
+            if parent.isValid():
+                self.dataChanged.emit(parent.sibling(parent.row(), 0),
+                                      parent.sibling(parent.row(), self.columnCount(parent.parent()) - 1))
+                rows = self.rowCount(parent)
+                if rows:
+                    self.dataChanged.emit(self.index(0, 0, parent),
+                                          self.index(rows - 1, self.columnCount(parent) - 1, parent))
+
     def data(self, index, role=Qt.DisplayRole):
-        if role == Qt.DisplayRole and index.column() == 1:
-            fileInfo = QFileInfo(self.filePath(index))
-            if fileInfo.isDir():
-                return self.directorySize(fileInfo.absoluteFilePath())
+        if role == Qt.DisplayRole and index.column() == 1 and self.isDir(index):
+            return self.directorySize(self.filePath(index))
         return super().data(index, role)
 
     def directorySize(self, path):
-        total_size = 0
-        for dirpath, _, filenames in os.walk(path):
-            for filename in filenames:
-                file_path = os.path.join(dirpath, filename)
-                total_size += os.path.getsize(file_path)
-        return self.formatSize(total_size)
+        size = self.size_engine.size(path)
+        if size is None:
+            return "Вычисление…"
+        return self.formatSize(size)
+
+    def onDirectorySizeReady(self, path):
+        index = self.index(path, 1)
+        if index.isValid():
+            self.dataChanged.emit(index, index, [Qt.DisplayRole])
+
+    def onWatcherOverflow(self):
+        self.size_engine.clear()
+        root = self.index(self.rootPath(), 1)
+        if root.isValid():
+            self.dataChanged.emit(root, root, [Qt.DisplayRole])
 
     def formatSize(self, size):
         for unit in ['', 'K', 'M', 'G', 'T', 'P', 'E', 'Z']:
@@ -1,10 +1,11 @@
 import logging
 import os
-import shutil
 
 from PyQt5.QtWidgets import QTreeView, QAbstractItemView, QMessageBox
 from PyQt5.QtCore import Qt
 
+from MovePlanner import MovePlanner
+
 
 logging.basicConfig(filename='super_app.log', level=logging.INFO, format='%(asctime)s - %(message)s')
 class CustomTreeView(QTreeView):
@@ -13,6 +14,7 @@ class CustomTreeView(QTreeView):
         self.setAcceptDrops(True)
         self.setDragEnabled(True)
         self.setDragDropMode(QAbstractItemView.InternalMove)
+        self.move_planner = MovePlanner()
 
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
@@ -32,7 +34,9 @@ class CustomTreeView(QTreeView):
             logging.warning("Недопустимое место для перетаскивания: не директория")
             return
 
+        touched_paths = [destination_folder]
         for url in event.mimeData().urls():
+            touched_paths.append(url.toLocalFile())
             try:
                 self.move_item(url, destination_folder)
                 logging.info(f"Файл {url.toLocalFile()} перемещен в {destination_folder}")
@@ -40,8 +44,7 @@ class CustomTreeView(QTreeView):
                 QMessageBox.critical(self, "Error Moving Item", str(e))
                 logging.error(f"Ошибка при перемещении файла {url.toLocalFile()} в {destination_folder}: {e}")
 
-        self.model().setRootPath('')  # Обновление модели для отражения изменений
-        self.model().setRootPath(destination_folder)
+        self.model().refreshPaths(touched_paths)  # Обновление только затронутых папок
 
     def move_item(self, url, destination_folder):
         file_name = os.path.basename(url.toLocalFile())
@@ -55,10 +58,7 @@ class CustomTreeView(QTreeView):
             if os.path.exists(destination_path) and not os.path.samefile(file_path, destination_path):
                 raise Exception(f"Файл '{file_name}' уже существует в целевой папке.")
 
-            if os.path.isdir(file_path):
-                shutil.move(file_path, destination_path)
-            elif os.path.isfile(file_path):
-                shutil.move(file_path, destination_path)
+            self.move_planner.move(file_path, destination_path)
 
     def get_destination_folder(self, pos):
         index = self.indexAt(pos)
@@ -0,0 +1,130 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from TreeWalker import TreeWalker
+
+
+class DirectorySizeEngine(QObject):
+    sizeReady = pyqtSignal(str)
+
+    def __init__(self, index=None, max_workers=4, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.walker = TreeWalker()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dir-size')
+        self.lock = threading.Lock()
+        self.sizes = {}
+        # Поколение пути: результат устаревшего вычисления отбрасывается
+        self.pending = {}
+        self.generation = 0
+
+    def size(self, path):
+        with self.lock:
+            if path in self.sizes:
+                return self.sizes[path]
+            if path not in self.pending:
+                self.pending[path] = self.generation
+                self.executor.submit(self._compute, path, self.generation)
+        return None
+
+    def invalidate(self, path):
+        path = os.path.normpath(path)
+        prefix = path.rstrip(os.sep) + os.sep
+        with self.lock:
+            self.generation += 1
+            for cached in list(self.sizes):
+                if cached == path or cached.startswith(prefix) or path.startswith(cached.rstrip(os.sep) + os.sep):
+                    del self.sizes[cached]
+            for cached in list(self.pending):
+                if cached == path or cached.startswith(prefix) or path.startswith(cached.rstrip(os.sep) + os.sep):
+                    del self.pending[cached]
+
+    def measure(self, path, callback):
+        # Размер пути без кэширования в модели; callback(размер) вызывается в потоке движка
+        self.executor.submit(self._measure, path, callback)
+
+    def _measure(self, path, callback):
+        try:
+            total_size = self.calculate(path)
+        except OSError as e:
+            logging.error(f"Ошибка при вычислении размера {path}: {e}")
+            return
+        callback(total_size)
+
+    def applyChange(self, directory):
+        self.executor.submit(self._apply_change, os.path.normpath(directory))
+
+    def _apply_change(self, directory):
+        if self.index is None:
+            self.invalidate(directory)
+            self.sizeReady.emit(directory)
+            return
+        try:
+            self.index.refresh(directory)
+        except OSError as e:
+            logging.error(f"Ошибка при обновлении размера папки {directory}: {e}")
+            return
+
+        # Размеры папки и ее предков берутся из индекса, а не досчитываются разницей:
+        # так параллельные обновления не могут учесть одно изменение дважды
+        ancestors = [directory]
+        while os.path.dirname(ancestors[-1]) != ancestors[-1]:
+            ancestors.append(os.path.dirname(ancestors[-1]))
+        with self.lock:
+            cached_ancestors = [path for path in ancestors if path in self.sizes]
+        totals = {path: self.index.lookup(path) for path in cached_ancestors}
+
+        changed = []
+        prefix = directory.rstrip(os.sep) + os.sep
+        with self.lock:
+            for cached in list(self.sizes):
+                if cached.startswith(prefix) and not os.path.isdir(cached):
+                    del self.sizes[cached]
+            for path in ancestors:
+                if path in totals and path in self.sizes:
+                    if totals[path] is None:
+                        # Папки нет в индексе: размер будет вычислен заново при следующем запросе
+                        del self.sizes[path]
+                    else:
+                        self.sizes[path] = totals[path][0]
+                    changed.append(path)
+                # Незавершенное вычисление могло не увидеть изменение
+                if self.pending.pop(path, None) is not None:
+                    changed.append(path)
+        for path in changed:
+            self.sizeReady.emit(path)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.sizes.clear()
+            self.pending.clear()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.index is not None:
+            self.index.close()
+
+    def _compute(self, path, generation):
+        try:
+            total_size = self.calculate(path)
+        except OSError as e:
+            logging.error(f"Ошибка при вычислении размера папки {path}: {e}")
+            total_size = 0
+        with self.lock:
+            if self.pending.get(path) != generation:
+                return
+            del self.pending[path]
+            self.sizes[path] = total_size
+        self.sizeReady.emit(path)
+
+    def calculate(self, path):
+        if self.index is not None:
+            total_size, _ = self.index.aggregate(path)
+            return total_size
+        total_size, _ = self.walker.size(path)
+        return total_size
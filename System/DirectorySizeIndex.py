@@ -0,0 +1,173 @@
+import logging
+import os
+import sqlite3
+import threading
+
+
+class DirectorySizeIndex:
+    def __init__(self, filename='directory_sizes.db'):
+        self.filename = filename
+        self.lock = threading.Lock()
+        # Чтение строки папки, сравнение, запись и перенос разницы на предков выполняются
+        # под этой блокировкой: иначе два одновременных обновления добавят предкам разницу дважды.
+        # Обход файловой системы идет без нее
+        self.update_lock = threading.Lock()
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        with self.lock:
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS directories ('
+                'path TEXT PRIMARY KEY, parent TEXT, mtime_ns INTEGER, inode INTEGER, '
+                'own_size INTEGER, own_count INTEGER, total_size INTEGER, total_count INTEGER)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS directories_parent ON directories(parent)')
+            self.connection.commit()
+
+    def aggregate(self, path):
+        # Возвращает (суммарный размер, количество файлов) для поддерева
+        try:
+            return self._aggregate(os.path.normpath(path))
+        finally:
+            with self.lock:
+                self.connection.commit()
+
+    def refresh(self, path):
+        # Пересканирует одну папку, не спускаясь в уже известные подпапки,
+        # и переносит разницу на всех предков.
+        # Возвращает (изменение размера, изменение количества файлов)
+        path = os.path.normpath(path)
+        try:
+            return self._refresh(path)
+        finally:
+            with self.lock:
+                self.connection.commit()
+
+    def _refresh(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with self.update_lock, self.lock:
+                row = self.connection.execute(
+                    'SELECT total_size, total_count FROM directories WHERE path = ?', (path,)).fetchone()
+                self._delete_subtree(path)
+                if row is None:
+                    return 0, 0
+                self._propagate(path, -row[0], -row[1])
+            return -row[0], -row[1]
+
+        own_size, own_count, children = self._scan(path)
+        known = self._forget_missing(path, children)
+        for child in children:
+            if child not in known:
+                self._aggregate(child)
+        return self._store(path, stat, own_size, own_count)[2:]
+    def lookup(self, path):
+        with self.lock:
+            return self.connection.execute(
+                'SELECT total_size, total_count FROM directories WHERE path = ?',
+                (os.path.normpath(path),)).fetchone()
+
+    def forget(self, path):
+        path = os.path.normpath(path)
+        with self.lock:
+            self._delete_subtree(path)
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
+
+    def _aggregate(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            with self.lock:
+                self._delete_subtree(path)
+            return 0, 0
+
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT mtime_ns, inode, own_size, own_count FROM directories WHERE path = ?', (path,)).fetchone()
+
+        # Каталог пересканируется только если изменились его mtime или inode
+        if row and row[0] == stat.st_mtime_ns and row[1] == stat.st_ino:
+            own_size, own_count = row[2], row[3]
+            with self.lock:
+                children = [child for (child,) in self.connection.execute(
+                    'SELECT path FROM directories WHERE parent = ?', (path,))]
+        else:
+            own_size, own_count, children = self._scan(path)
+            self._forget_missing(path, children)
+
+        for child in children:
+            self._aggregate(child)
+        return self._store(path, stat, own_size, own_count)[:2]
+
+    def _forget_missing(self, path, children):
+        # Убирает из индекса исчезнувшие подпапки; возвращает подпапки, которые в нем есть
+        with self.lock:
+            known = {child for (child,) in self.connection.execute(
+                'SELECT path FROM directories WHERE parent = ?', (path,))}
+            for child in known - set(children):
+                self._delete_subtree(child)
+        return known
+
+    def _store(self, path, stat, own_size, own_count):
+        # Итог папки складывается из ее файлов и строк подпапок, уже записанных в индекс, поэтому
+        # параллельное обновление подпапки учитывается ровно один раз: либо оно уже в строке
+        # подпапки, либо еще перенесется на эту папку через _propagate.
+        # Возвращает (размер, количество, изменение размера, изменение количества)
+        with self.update_lock, self.lock:
+            children_size, children_count = self.connection.execute(
+                'SELECT COALESCE(SUM(total_size), 0), COALESCE(SUM(total_count), 0) '
+                'FROM directories WHERE parent = ?', (path,)).fetchone()
+            total_size, total_count = own_size + children_size, own_count + children_count
+            row = self.connection.execute(
+                'SELECT total_size, total_count FROM directories WHERE path = ?', (path,)).fetchone()
+            self.connection.execute(
+                'INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (path, os.path.dirname(path), stat.st_mtime_ns, stat.st_ino,
+                 own_size, own_count, total_size, total_count))
+            delta_size, delta_count = total_size - (row[0] if row else 0), total_count - (row[1] if row else 0)
+            self._propagate(path, delta_size, delta_count)
+        return total_size, total_count, delta_size, delta_count
+
+    def _scan(self, path):
+        own_size = 0
+        own_count = 0
+        children = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            children.append(entry.path)
+                        elif entry.is_file():
+                            own_size += entry.stat().st_size
+                            own_count += 1
+                    except OSError:
+                        pass
+        except OSError as e:
+            logging.error(f"Ошибка при сканировании папки {path}: {e}")
+        return own_size, own_count, children
+
+    def _delete_subtree(self, path):
+        prefix = path.rstrip(os.sep) + os.sep
+        self.connection.execute(
+            'DELETE FROM directories WHERE path = ? OR substr(path, 1, ?) = ?',
+            (path, len(prefix), prefix))
+
+    def _propagate(self, path, delta_size, delta_count):
+        if not delta_size and not delta_count:
+            return
+        parent = os.path.dirname(path)
+        while parent != path:
+            cursor = self.connection.execute(
+                'UPDATE directories SET total_size = total_size + ?, total_count = total_count + ? WHERE path = ?',
+                (delta_size, delta_count, parent))
+            # Предка нет в индексе: при первом сканировании его итог сложится из строк
+            # подпапок в _store, а выше него индексированных итогов, включающих эту папку, нет
+            if not cursor.rowcount:
+                return
+            path, parent = parent, os.path.dirname(parent)
@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import mmap
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from TreeWalker import TreeWalker
+
+PARTIAL_BLOCK_SIZE = 64 * 1024
+HASH_WINDOW = 16 * 1024 * 1024
+
+
+def partial_hash(path, size):
+    # Хеш первого и последнего блоков файла
+    digest = hashlib.blake2b()
+    try:
+        with open(path, 'rb') as f:
+            digest.update(f.read(PARTIAL_BLOCK_SIZE))
+            if size > PARTIAL_BLOCK_SIZE:
+                f.seek(max(size - PARTIAL_BLOCK_SIZE, PARTIAL_BLOCK_SIZE))
+                digest.update(f.read(PARTIAL_BLOCK_SIZE))
+    except OSError:
+        return None
+    return digest.digest()
+
+
+def full_hash(path):
+    digest = hashlib.blake2b()
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            view = memoryview(data)
+            try:
+                for start in range(0, len(data), HASH_WINDOW):
+                    digest.update(view[start:start + HASH_WINDOW])
+            finally:
+                view.release()
+    except (OSError, ValueError):
+        return None
+    return digest.digest()
+
+
+class DuplicateFinder:
+    def __init__(self, max_workers=None, walker=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.walker = walker or TreeWalker()
+        self.executor = None
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def search(self, root, cancel_event):
+        # Генератор результатов (путь, текст) для SearchService: группы одинаковых файлов
+        # выдаются по мере того, как досчитываются их полные хеши
+        by_size = self.group_by_size(root, cancel_event)
+        candidates = [(size, paths) for size, paths in by_size.items() if len(paths) > 1]
+        logging.info(f"Поиск дубликатов в {root}: {sum(len(paths) for _, paths in candidates)} кандидатов по размеру")
+
+        by_partial = defaultdict(list)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='duplicates') as hashers:
+            for size, paths in candidates:
+                if cancel_event.is_set():
+                    return
+                for path, digest in zip(paths, hashers.map(partial_hash, paths, [size] * len(paths))):
+                    if digest is not None:
+                        by_partial[size, digest].append(path)
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+        number = 0
+        running = {}
+        remaining = {}
+        hashes = defaultdict(list)
+        for key, paths in by_partial.items():
+            if len(paths) < 2:
+                continue
+            size = key[0]
+            if size <= 2 * PARTIAL_BLOCK_SIZE:
+                # Первый и последний блоки уже покрыли весь файл
+                number += 1
+                yield from self.group(root, number, size, paths)
+                continue
+            remaining[key] = len(paths)
+            for path in paths:
+                running[self.executor.submit(full_hash, path)] = (key, path)
+
+        try:
+            while running and not cancel_event.is_set():
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, path = running.pop(future)
+                    try:
+                        digest = future.result()
+                    except Exception as e:
+                        logging.error(f"Ошибка хеширования {path}: {e}")
+                        digest = None
+                    if digest is not None:
+                        hashes[key + (digest,)].append(path)
+                    remaining[key] -= 1
+                    if remaining[key]:
+                        continue
+                    for full_key in [k for k in hashes if k[:2] == key]:
+                        paths = hashes.pop(full_key)
+                        if len(paths) > 1:
+                            number += 1
+                            yield from self.group(root, number, key[0], paths)
+        finally:
+            for future in running:
+                future.cancel()
+
+    def group_by_size(self, root, cancel_event):
+        by_size = defaultdict(list)
+        seen = set()
+        for entry in self.walker.files(root):
+            if cancel_event.is_set():
+                break
+            # Хеши читают файл по ссылке, а размер взят бы у самой ссылки; цель ссылки,
+            # если она внутри root, и так будет найдена обходом
+            if entry.is_symlink():
+                continue
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            # Жесткие ссылки на один и тот же файл дубликатами не считаются
+            if stat.st_size == 0 or (stat.st_dev, stat.st_ino) in seen:
+                continue
+            seen.add((stat.st_dev, stat.st_ino))
+            by_size[stat.st_size].append(entry.path)
+        return by_size
+
+    def group(self, root, number, size, paths):
+        for path in sorted(paths):
+            yield path, f"Группа {number}, {size} байт: {os.path.relpath(path, root)}"
@@ -1,25 +1,74 @@
 import mmap
+import os
+
 
 class FileMapping:
-    def __init__(self, filename, size):
+    # Файл отображается в память один раз и остается открытым до close().
+    # С create=False существующий файл подключается только для чтения, без обнуления
+    def __init__(self, filename, size=None, create=True, header=b''):
         self.filename = filename
+        if create:
+            self.size = size
+            self.create_file(header)
+            self.file = open(self.filename, 'r+b')
+            self.access = mmap.ACCESS_WRITE
+        else:
+            self.file = open(self.filename, 'rb')
+            self.size = os.fstat(self.file.fileno()).st_size
+            self.access = mmap.ACCESS_READ
+        self.mmap = mmap.mmap(self.file.fileno(), self.size, access=self.access)
+
+    def create_file(self, header=b''):
+        # Новый файл подменяет старый атомарно: подключенные к старому файлу процессы
+        # не увидят его обнуления или усечения и смогут переподключиться (см. replaced())
+        temporary_path = f'{self.filename}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as f:
+            f.write(header + b'\x00' * (self.size - len(header)))
+        os.replace(temporary_path, self.filename)
+
+    def replaced(self):
+        # Файл по этому пути пересоздан или удален после подключения
+        try:
+            return os.stat(self.filename).st_ino != os.fstat(self.file.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def close(self):
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def resize(self, size):
+        # Перед изменением размера все memoryview, полученные из view(), должны быть освобождены
+        if size == self.size:
+            return
+        self.file.truncate(size)
+        self.mmap.resize(size)
         self.size = size
-        self.create_file()
 
-    def create_file(self):
-        with open(self.filename, 'wb') as f:
-            f.write(b'\x00' * self.size)
+    def remap(self):
+        # Размер файла мог изменить другой процесс
+        size = os.fstat(self.file.fileno()).st_size
+        if size != self.size:
+            self.mmap.close()
+            self.mmap = mmap.mmap(self.file.fileno(), size, access=self.access)
+            self.size = size
 
-    def get_mmap(self):
-        file = open(self.filename, 'r+b')
-        return mmap.mmap(file.fileno(), self.size)
+    def view(self, size, offset=0):
+        # Чтение без копирования; вызывающий освобождает memoryview через release() или with
+        return memoryview(self.mmap)[offset:offset + size]
 
     def write(self, data, offset=0):
-        with self.get_mmap() as m:
-            m.seek(offset)
-            m.write(data)
+        self.mmap[offset:offset + len(data)] = data
 
     def read(self, size, offset=0):
-        with self.get_mmap() as m:
-            m.seek(offset)
-            return m.read(size)
+        return self.mmap[offset:offset + size]
@@ -0,0 +1,278 @@
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from CopyEngine import CopyEngine
+from MovePlanner import MovePlanner
+from TreeWalker import TreeWalker
+
+PROGRESS_INTERVAL = 0.1
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def device_of(path):
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return None
+
+
+class FileJob:
+    _ids = itertools.count(1)
+
+    def __init__(self, kind, sources, destination=None, batch=None, resumable=False):
+        self.id = next(self._ids)
+        self.batch = batch
+        self.kind = kind
+        # Копирование блоками с журналом, которое можно продолжить после обрыва
+        self.resumable = resumable
+        self.sources = [os.path.normpath(source) for source in sources]
+        self.destination = os.path.normpath(destination) if destination else None
+        self.bytes_total = 0
+        self.files_total = 0
+        self.bytes_done = 0
+        self.files_done = 0
+        self.started = None
+        self.last_progress = 0.0
+        self.touched = set()
+        self.resumed = threading.Event()
+        self.resumed.set()
+        self.cancelled = False
+
+    @staticmethod
+    def device_for(source, destination=None):
+        # Очередь выбирается по устройству, на которое идет запись
+        return device_of(os.path.normpath(destination) if destination
+                         else os.path.dirname(os.path.normpath(source)))
+
+    def device(self):
+        return self.device_for(self.sources[0], self.destination)
+
+    def checkpoint(self):
+        self.resumed.wait()
+        if self.cancelled:
+            raise JobCancelled()
+
+
+class FileOperationQueue(QObject):
+    # id, байт выполнено, байт всего, файлов выполнено, файлов всего, байт/с, файлов/с, осталось секунд
+    jobProgress = pyqtSignal(int, int, int, int, int, float, float, float)
+    jobFinished = pyqtSignal(int, list)
+    jobFailed = pyqtSignal(int, str, list)
+    # id пакета и все пути, затронутые его заданиями
+    batchFinished = pyqtSignal(int, list)
+
+    def __init__(self, walker=None, transfer_journals='.transfers', parent=None):
+        super().__init__(parent)
+        self.walker = walker or TreeWalker()
+        self.copy_engine = CopyEngine(walker=self.walker, transfer_journals=transfer_journals)
+        self.move_planner = MovePlanner(self.copy_engine)
+        self.jobs = {}
+        self.queues = {}
+        self.batches = {}
+        self.batch_ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def copy(self, sources, destination, resumable=False):
+        return self.submit_batch('copy', sources, destination, resumable)
+
+    def move(self, sources, destination):
+        return self.submit_batch('move', sources, destination)
+
+    def delete(self, sources):
+        return self.submit_batch('delete', sources)
+
+    def submit_batch(self, kind, sources, destination=None, resumable=False):
+        # Источники группируются по устройству записи, как и очереди заданий: группы на разных
+        # устройствах выполняются параллельно, а по завершении пакета отправляется один batchFinished
+        groups = {}
+        for source in sources:
+            groups.setdefault(FileJob.device_for(source, destination), []).append(source)
+        batch_id = next(self.batch_ids)
+        jobs = [FileJob(kind, group, destination, batch_id, resumable) for group in groups.values()]
+        with self.lock:
+            self.batches[batch_id] = [len(jobs), set()]
+        for job in jobs:
+            self.submit(job)
+        return batch_id
+
+    def submit(self, job):
+        device = job.device()
+        with self.lock:
+            self.jobs[job.id] = job
+            # Задания на одном устройстве выполняются по очереди, на разных - параллельно
+            if device not in self.queues:
+                self.queues[device] = queue.Queue()
+                threading.Thread(target=self._worker, args=(self.queues[device],),
+                                 name=f'file-ops-{device}', daemon=True).start()
+            self.queues[device].put(job)
+        logging.info(f"Задание {job.id} ({job.kind}) поставлено в очередь: {job.sources} -> {job.destination}")
+        return job.id
+
+    def resume_transfers(self, root):
+        # Продолжает прерванные блочные передачи, журналы которых лежат в root
+        job_ids = []
+        for source, target in self.copy_engine.chunked.pending(root):
+            if not os.path.exists(source):
+                logging.warning(f"Источник прерванной передачи {source} больше не существует")
+                self.copy_engine.chunked.discard(target)
+                continue
+            job_ids.append(self.submit(FileJob('copy', [source], os.path.dirname(target), resumable=True)))
+        return job_ids
+
+    def pause(self, job_id):
+        job = self.jobs.get(job_id)
+        if job:
+            job.resumed.clear()
+
+    def resume(self, job_id):
+        job = self.jobs.get(job_id)
+        if job:
+            job.resumed.set()
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job:
+            job.cancelled = True
+            job.resumed.set()
+
+    def active_jobs(self):
+        with self.lock:
+            return list(self.jobs)
+
+    def _worker(self, jobs):
+        while True:
+            job = jobs.get()
+            try:
+                self._run(job)
+                logging.info(f"Задание {job.id} выполнено: {job.files_done} файлов, {job.bytes_done} байт")
+                self.jobFinished.emit(job.id, sorted(job.touched))
+            except JobCancelled:
+                logging.info(f"Задание {job.id} отменено")
+                self.jobFailed.emit(job.id, "Операция отменена", sorted(job.touched))
+            except Exception as e:
+                logging.error(f"Ошибка выполнения задания {job.id}: {e}")
+                self.jobFailed.emit(job.id, str(e), sorted(job.touched))
+            finally:
+                self._finish(job)
+
+    def _finish(self, job):
+        with self.lock:
+            self.jobs.pop(job.id, None)
+            batch = self.batches.get(job.batch)
+            if batch is None:
+                return
+            batch[0] -= 1
+            batch[1].update(job.touched)
+            if batch[0]:
+                return
+            del self.batches[job.batch]
+        self.batchFinished.emit(job.batch, sorted(batch[1]))
+
+    def _run(self, job):
+        for source in job.sources:
+            # Перемещение внутри устройства - это rename, считать размер не нужно
+            if job.kind == 'move' and self.move_planner.same_device(source, job.destination):
+                job.files_total += 1
+            elif os.path.isdir(source) and not os.path.islink(source):
+                size, count = self.walker.size(source)
+                job.bytes_total += size
+                job.files_total += count
+            elif os.path.lexists(source):
+                job.bytes_total += os.lstat(source).st_size
+                job.files_total += 1
+        job.started = time.monotonic()
+
+        copies = []
+        for source in job.sources:
+            job.checkpoint()
+            job.touched.add(source)
+            if job.kind == 'delete':
+                self._delete(job, source)
+                continue
+            target = os.path.join(job.destination, os.path.basename(source))
+            job.touched.add(target)
+            if job.kind == 'move':
+                self._move(job, source, target)
+            else:
+                # Вставка в ту же папку создает копию под новым именем
+                if os.path.lexists(target) and os.path.samefile(source, target):
+                    target = self.copy_name(target)
+                    job.touched.add(target)
+                copies.append((source, target))
+        if copies:
+            self._copy(job, copies)
+        self._report(job, force=True)
+
+    def copy_name(self, path):
+        if os.path.isdir(path):
+            stem, extension = path, ''
+        else:
+            stem, extension = os.path.splitext(path)
+        candidate = f"{stem} (копия){extension}"
+        number = 2
+        while os.path.lexists(candidate):
+            candidate = f"{stem} (копия {number}){extension}"
+            number += 1
+        return candidate
+
+    def _copy(self, job, pairs):
+        # Все источники задания копируются одним пулом, а не по одному
+        def progress(nbytes, nfiles):
+            job.bytes_done += nbytes
+            job.files_done += nfiles
+            self._report(job)
+
+        self.copy_engine.copy_many(pairs, progress, job.checkpoint, resumable=job.resumable)
+
+    def _move(self, job, source, target):
+        def progress(nbytes, nfiles):
+            job.bytes_done += nbytes
+            job.files_done += nfiles
+            self._report(job)
+
+        if self.move_planner.move(source, target, progress, job.checkpoint) == 'rename':
+            self._advance(job, 0)
+
+    def _delete(self, job, source, count_progress=True):
+        if os.path.isdir(source) and not os.path.islink(source):
+            with os.scandir(source) as entries:
+                for entry in entries:
+                    job.checkpoint()
+                    self._delete(job, entry.path, count_progress)
+            os.rmdir(source)
+        else:
+            size = os.lstat(source).st_size
+            os.remove(source)
+            if count_progress:
+                self._advance(job, size)
+
+    def _advance(self, job, size):
+        job.bytes_done += size
+        job.files_done += 1
+        self._report(job)
+
+    def _report(self, job, force=False):
+        now = time.monotonic()
+        if not force and now - job.last_progress < PROGRESS_INTERVAL:
+            return
+        job.last_progress = now
+        elapsed = max(now - job.started, 1e-6)
+        bytes_per_second = job.bytes_done / elapsed
+        files_per_second = job.files_done / elapsed
+        if bytes_per_second > 0:
+            eta = max(job.bytes_total - job.bytes_done, 0) / bytes_per_second
+        elif files_per_second > 0:
+            eta = max(job.files_total - job.files_done, 0) / files_per_second
+        else:
+            eta = -1.0
+        self.jobProgress.emit(job.id, job.bytes_done, job.bytes_total, job.files_done, job.files_total,
+                              bytes_per_second, files_per_second, eta)
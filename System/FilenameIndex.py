@@ -0,0 +1,137 @@
+import fnmatch
+import logging
+import os
+import re
+import threading
+import time
+from array import array
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from TreeWalker import TreeWalker
+
+GLOB_CHARS = re.compile(r'\[[^\]]*\]|[*?]')
+
+
+class FilenameIndex:
+    def __init__(self, walker=None, ignored=()):
+        self.walker = walker or TreeWalker()
+        self.ignored = [os.path.normpath(path) for path in ignored]
+        self.lock = threading.RLock()
+        self.paths = []
+        self.ids = {}
+        # Триграмма имени в нижнем регистре -> возрастающий список id
+        self.postings = defaultdict(lambda: array('I'))
+        # Папка -> пути ее элементов в индексе, чтобы удаление поддерева не перебирало весь индекс
+        self.children = defaultdict(set)
+        self.removed = 0
+        self.root = None
+        self.ready = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='filename-index')
+
+    def build(self, root):
+        self.root = os.path.normpath(root)
+        self.ready.clear()
+        self.executor.submit(self._build, self.root)
+
+    def _build(self, root):
+        started = time.monotonic()
+        with self.lock:
+            self.paths = []
+            self.ids = {}
+            self.postings.clear()
+            self.children.clear()
+            self.removed = 0
+        for entry in self.walker.walk(root):
+            if not self.is_ignored(entry.path):
+                self._add(entry.path)
+        self.ready.set()
+        logging.info(f"Построен индекс имен файлов для {root}: {len(self.ids)} объектов "
+                     f"за {time.monotonic() - started:.2f} с")
+
+    def update(self, path):
+        # Вызывается при изменении пути; работа выполняется в фоне
+        self.executor.submit(self._update, os.path.normpath(path))
+
+    def remove(self, path):
+        # Убирает path и все его содержимое, даже если по этому пути уже создан новый объект
+        self.executor.submit(self._remove_tree, os.path.normpath(path))
+
+    def is_ignored(self, path):
+        return any(path == ignored or path.startswith(ignored + os.sep) for ignored in self.ignored)
+
+    def _update(self, path):
+        if self.is_ignored(path):
+            return
+        if os.path.lexists(path):
+            if path not in self.ids:
+                self._add(path)
+                if os.path.isdir(path) and not os.path.islink(path):
+                    for entry in self.walker.walk(path):
+                        self._add(entry.path)
+        else:
+            self._remove_tree(path)
+        # Слишком много удаленных записей: индекс перестраивается целиком
+        if self.ready.is_set() and self.removed > max(len(self.paths) // 2, 1000):
+            self._build(self.root)
+
+    def _add(self, path):
+        with self.lock:
+            if path in self.ids:
+                return
+            path_id = len(self.paths)
+            self.paths.append(path)
+            self.ids[path] = path_id
+            self.children[os.path.dirname(path)].add(path)
+            for trigram in self.trigrams(os.path.basename(path).lower()):
+                self.postings[trigram].append(path_id)
+
+    def _remove_tree(self, path):
+        # Обходит только само поддерево path
+        with self.lock:
+            siblings = self.children.get(os.path.dirname(path))
+            if siblings is not None:
+                siblings.discard(path)
+            stack = [path]
+            while stack:
+                candidate = stack.pop()
+                stack.extend(self.children.pop(candidate, ()))
+                if candidate in self.ids:
+                    self.paths[self.ids.pop(candidate)] = None
+                    self.removed += 1
+
+    def trigrams(self, text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def search(self, query, limit=None):
+        if GLOB_CHARS.search(query):
+            return self.search_glob(query, limit)
+        return self.search_substring(query, limit)
+
+    def search_substring(self, text, limit=None):
+        return self._search(text.lower(), lambda name: text in name, limit)
+
+    def search_prefix(self, prefix, limit=None):
+        return self._search(prefix.lower(), lambda name: name.startswith(prefix), limit)
+
+    def search_glob(self, pattern, limit=None):
+        # Для отбора кандидатов берется самый длинный литеральный фрагмент шаблона
+        literal = max(GLOB_CHARS.split(pattern), key=len)
+        return self._search(literal.lower(), lambda name: fnmatch.fnmatchcase(name, pattern), limit)
+
+    def _search(self, key, matches, limit):
+        with self.lock:
+            trigrams = self.trigrams(key)
+            if trigrams:
+                # Достаточно проверить кандидатов из самого короткого списка
+                candidates = min((self.postings.get(t, ()) for t in trigrams), key=len)
+                candidates = [self.paths[path_id] for path_id in candidates]
+            else:
+                candidates = self.paths
+            results = []
+            for path in candidates:
+                if path is not None and matches(path[path.rfind(os.sep) + 1:]):
+                    results.append(path)
+                    if limit is not None and len(results) >= limit:
+                        break
+            return results
@@ -0,0 +1,164 @@
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+# IN_MODIFY не используется: запись большого файла порождает тысячи событий,
+# а для размеров достаточно IN_CLOSE_WRITE
+WATCH_MASK = (IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+              IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher(QObject):
+    # Папка, имя изменившегося элемента, маска события
+    directoryChanged = pyqtSignal(str, str, int)
+    overflow = pyqtSignal()
+
+    def __init__(self, ignored=(), parent=None):
+        super().__init__(parent)
+        # Папки, за которыми не нужно следить (например, очищаемая в фоне корзина)
+        self.ignored = set(ignored)
+        self.watches = {}
+        self.paths = {}
+        self.lock = threading.Lock()
+        self.fd = -1
+        self.thread = None
+        self.stop_read, self.stop_write = os.pipe()
+        self.available = self._init_inotify()
+
+    def _init_inotify(self):
+        library = ctypes.util.find_library('c') or 'libc.so.6'
+        try:
+            self.libc = ctypes.CDLL(library, use_errno=True)
+            self.libc.inotify_init1.argtypes = [ctypes.c_int]
+            self.libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+            self.libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        except (OSError, AttributeError) as e:
+            logging.warning(f"inotify недоступен: {e}")
+            return False
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            logging.warning(f"Ошибка inotify_init1: {os.strerror(ctypes.get_errno())}")
+            return False
+        return True
+
+    def watch(self, root):
+        if not self.available:
+            return
+        self.add_tree(root)
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='inotify', daemon=True)
+            self.thread.start()
+        logging.info(f"Наблюдение за {root}: {len(self.watches)} папок")
+
+    def stop(self):
+        if self.thread is not None:
+            os.write(self.stop_write, b'x')
+            self.thread.join()
+            self.thread = None
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def add_tree(self, root):
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            if path in self.ignored or not self.add_watch(path):
+                continue
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+            except OSError:
+                pass
+
+    def add_watch(self, path):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                logging.warning(f"Достигнут лимит inotify watches, папка {path} не отслеживается")
+            return False
+        with self.lock:
+            self.watches[wd] = path
+            self.paths[path] = wd
+        return True
+
+    def remove_tree(self, root):
+        prefix = root.rstrip(os.sep) + os.sep
+        with self.lock:
+            for path in [p for p in self.paths if p == root or p.startswith(prefix)]:
+                wd = self.paths.pop(path)
+                self.watches.pop(wd, None)
+                self.libc.inotify_rm_watch(self.fd, wd)
+
+    def run(self):
+        while True:
+            readable, _, _ = select.select([self.fd, self.stop_read], [], [])
+            if self.stop_read in readable:
+                return
+            try:
+                buffer = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                logging.error(f"Ошибка чтения событий inotify: {e}")
+                return
+            self.dispatch(buffer)
+
+    def dispatch(self, buffer):
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buffer):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset:offset + length].rstrip(b'\x00'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                logging.warning("Переполнение очереди inotify")
+                self.overflow.emit()
+                continue
+            with self.lock:
+                directory = self.watches.get(wd)
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+                    if directory is not None:
+                        self.paths.pop(directory, None)
+            if directory is None or mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                continue
+
+            path = os.path.join(directory, name)
+            if path in self.ignored:
+                continue
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self.add_tree(path)
+                elif mask & IN_MOVED_FROM:
+                    self.remove_tree(path)
+            self.directoryChanged.emit(directory, name, mask)
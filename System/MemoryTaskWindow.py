@@ -1,7 +1,19 @@
 import sys
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QTextEdit, QPushButton, QMessageBox, QDialog
+from datetime import datetime
+
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtGui import QFontDatabase
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QTextEdit, QPushButton, QMessageBox, QDialog, QLabel
+
+from TelemetryRecord import TelemetryRecord
+
+SPARK_CHARS = '▁▂▃▄▅▆▇█'
+SPARK_WIDTH = 60
 
 class MemoryTaskWindow(QDialog):
+    # Окно показано или скрыто: пока окно скрыто, замеры можно делать реже
+    visibilityChanged = pyqtSignal(bool)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Задание по обновлению информации о памяти")
@@ -9,14 +21,55 @@ class MemoryTaskWindow(QDialog):
         self.output_text = QTextEdit()
         self.output_text.setReadOnly(True)
         layout.addWidget(self.output_text)
+        # История использования памяти: минута, 10 минут и час
+        self.history_label = QLabel()
+        self.history_label.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        layout.addWidget(self.history_label)
         self.setLayout(layout)
+        self.metrics = None
 
     def update_info(self):
         if self.memory_manager:
-            data = self.memory_manager.read(1024).decode('utf-8').strip('\x00')
-            self.output_text.setPlainText(data)
+            # Если данные не менялись с прошлого раза, окно не перерисовывается
+            self.version, data = self.memory_manager.read_if_changed(self.version, TelemetryRecord.SIZE)
+            if data is not None:
+                self.output_text.setPlainText(self.format_record(TelemetryRecord.unpack(data)))
+                self.update_history()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.visibilityChanged.emit(True)
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.visibilityChanged.emit(False)
+
+    def update_history(self):
+        if self.metrics is None:
+            return
+        lines = []
+        for level, title in enumerate(('1 мин ', '10 мин', '1 час ')):
+            lines.append(f'{title} {self.sparkline(self.metrics.values(level, SPARK_WIDTH))}')
+        self.history_label.setText('\n'.join(lines))
+
+    @staticmethod
+    def sparkline(values):
+        # Проценты 0-100 отображаются на восемь уровней символов
+        top = len(SPARK_CHARS) - 1
+        return ''.join(SPARK_CHARS[min(max(int(value * top / 100 + 0.5), 0), top)] for value in values)
+
+    @staticmethod
+    def format_record(record):
+        if record is None:
+            return 'Данные еще не получены'
+        return (f'Процент используемой физической памяти: {record.memory_percent:.1f}%\n'
+                f'Ширина и высота рамки приложения: {record.app_width}x{record.app_height}\n'
+                f'Ширина и высота рамки экрана: {record.screen_width}x{record.screen_height}\n'
+                f'Время замера: {datetime.fromtimestamp(record.timestamp).strftime("%H:%M:%S")}')
 
-    def set_memory_manager(self, memory_manager):
+    def set_memory_manager(self, memory_manager, metrics=None):
         self.memory_manager = memory_manager
+        self.metrics = metrics
+        self.version = None
         self.update_info()
 
@@ -0,0 +1,84 @@
+import struct
+
+# Уровни истории: интервал между отсчетами в секундах и число хранимых отсчетов.
+# 1 с - последний час, 10 с - последние 6 часов, 1 мин - последние сутки
+TIERS = ((1, 3600), (10, 2160), (60, 1440))
+# Заголовок уровня: интервал, емкость, сколько всего отсчетов записано
+TIER_HEADER = struct.Struct('<IIQ')
+# Отсчет: время (Unix time) и средний процент занятой памяти за интервал
+SAMPLE = struct.Struct('<dd')
+
+
+class MetricsRing:
+    # Кольцевые буферы отсчетов в общей памяти, по одному на уровень TIERS.
+    # Уровни лежат подряд с offset: заголовок TIER_HEADER, затем capacity отсчетов SAMPLE;
+    # отсчет номер n хранится в ячейке n % capacity, и каждый отсчет уровня занимает ровно
+    # один его интервал. С attach=True заголовки не перезаписываются
+    def __init__(self, memory_manager, offset=0, attach=False):
+        self.memory_manager = memory_manager
+        self.offset = offset
+        self.tiers = []
+        position = offset
+        for interval, capacity in TIERS:
+            self.tiers.append({'interval': interval, 'capacity': capacity, 'offset': position,
+                               'count': 0, 'bucket': None, 'sum': 0.0, 'samples': 0, 'last': None})
+            position += TIER_HEADER.size + capacity * SAMPLE.size
+        if attach:
+            return
+        self.memory_manager.write_many([(tier['offset'], TIER_HEADER.pack(tier['interval'], tier['capacity'], 0))
+                                        for tier in self.tiers])
+
+    @staticmethod
+    def size():
+        return sum(TIER_HEADER.size + capacity * SAMPLE.size for _, capacity in TIERS)
+
+    def append(self, timestamp, memory_percent):
+        # Первый уровень получает каждый отсчет, остальные - средние за свой интервал
+        parts = []
+        for tier in self.tiers:
+            bucket = int(timestamp // tier['interval'])
+            if tier['interval'] == 1:
+                self._store_second(tier, bucket, timestamp, memory_percent, parts)
+                continue
+            if tier['bucket'] is not None and bucket != tier['bucket'] and tier['samples']:
+                self._store(tier, tier['bucket'] * tier['interval'], tier['sum'] / tier['samples'], parts)
+                tier['sum'] = 0.0
+                tier['samples'] = 0
+            tier['bucket'] = bucket
+            tier['sum'] += memory_percent
+            tier['samples'] += 1
+        self.memory_manager.write_many(parts)
+
+    def _store_second(self, tier, bucket, timestamp, value, parts):
+        # Без видимых потребителей память опрашивается реже раза в секунду: пропущенные
+        # секунды заполняются последним значением, а второй отсчет той же секунды заменяет первый
+        if tier['bucket'] == bucket:
+            tier['count'] -= 1
+        elif tier['bucket'] is not None and bucket > tier['bucket']:
+            for missed in range(max(tier['bucket'] + 1, bucket - tier['capacity'] + 1), bucket):
+                self._store(tier, float(missed), tier['last'], parts)
+        self._store(tier, timestamp, value, parts)
+        tier['bucket'] = bucket
+        tier['last'] = value
+
+    def _store(self, tier, timestamp, value, parts):
+        slot = tier['count'] % tier['capacity']
+        parts.append((tier['offset'] + TIER_HEADER.size + slot * SAMPLE.size, SAMPLE.pack(timestamp, value)))
+        tier['count'] += 1
+        parts.append((tier['offset'], TIER_HEADER.pack(tier['interval'], tier['capacity'], tier['count'])))
+
+    def values(self, level, limit):
+        # Последние limit значений уровня level от старых к новым; читается прямо из отображения
+        tier = self.tiers[level]
+        size = TIER_HEADER.size + tier['capacity'] * SAMPLE.size
+
+        def reader(view):
+            _, capacity, count = TIER_HEADER.unpack_from(view, 0)
+            # Отсчеты - пары double, поэтому область данных читается как массив double
+            samples = view[TIER_HEADER.size:].cast('d')
+            try:
+                return [samples[(n % capacity) * 2 + 1] for n in range(max(count - min(limit, capacity), 0), count)]
+            finally:
+                samples.release()
+
+        return self.memory_manager.read_with(size, tier['offset'], reader)
@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class MetricsSampler(QObject):
+    # Значения метрик изменились; доставляется в поток GUI
+    changed = pyqtSignal()
+
+    def __init__(self, publish, parent=None):
+        super().__init__(parent)
+        # publish(values, sampled) вызывается в потоке замеров после каждого цикла опроса;
+        # sampled - имена метрик, опрошенных в этом цикле
+        self.publish = publish
+        self.metrics = {}
+        self.values = {}
+        self.consumers = set()
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def add_metric(self, name, sample, interval, idle_interval=None):
+        # sample() опрашивается каждые interval секунд, пока есть видимые потребители,
+        # и каждые idle_interval секунд, когда их нет (None - не опрашивать вовсе)
+        with self.lock:
+            self.metrics[name] = {'sample': sample, 'interval': interval,
+                                  'idle_interval': idle_interval, 'due': 0.0}
+        self.wake.set()
+
+    def set_value(self, name, value):
+        # Метрики, о которых сообщают события (например, размер окна), а не опрос
+        with self.lock:
+            if self.values.get(name) == value:
+                return
+            self.values[name] = value
+            self.dirty = True
+        self.wake.set()
+
+    def set_consumer(self, consumer, visible):
+        with self.lock:
+            if visible:
+                self.consumers.add(consumer)
+                # Появившийся потребитель получает свежие данные сразу
+                for metric in self.metrics.values():
+                    metric['due'] = 0.0
+            else:
+                self.consumers.discard(consumer)
+        self.wake.set()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='metrics-sampler', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        while not self.stopped.is_set():
+            now = time.monotonic()
+            with self.lock:
+                active = bool(self.consumers)
+                due = [(name, metric) for name, metric in self.metrics.items() if metric['due'] <= now]
+            sampled = {}
+            for name, metric in due:
+                try:
+                    sampled[name] = metric['sample']()
+                except Exception as e:
+                    logging.error(f"Ошибка замера {name}: {e}")
+            with self.lock:
+                for name, metric in due:
+                    interval = metric['interval'] if active else metric['idle_interval']
+                    metric['due'] = now + interval if interval is not None else float('inf')
+                for name, value in sampled.items():
+                    if self.values.get(name) != value:
+                        self.values[name] = value
+                        self.dirty = True
+                changed = self.dirty
+                self.dirty = False
+                values = dict(self.values)
+                timeout = min((metric['due'] for metric in self.metrics.values()), default=float('inf')) - now
+                self.wake.clear()
+            if sampled or changed:
+                self.publish(values, set(sampled))
+            if changed:
+                self.changed.emit()
+            # Поток спит до следующего замера или до события set_value/set_consumer
+            self.wake.wait(None if timeout == float('inf') else max(timeout, 0))
@@ -0,0 +1,55 @@
+import errno
+import logging
+import os
+import shutil
+import time
+
+from CopyEngine import CopyEngine
+
+
+class MovePlanner:
+    def __init__(self, copy_engine=None):
+        self.copy_engine = copy_engine or CopyEngine()
+
+    def same_device(self, source, destination_folder):
+        try:
+            return os.lstat(source).st_dev == os.stat(destination_folder).st_dev
+        except OSError:
+            return False
+
+    def move(self, source, target, progress=None, checkpoint=None):
+        # Внутри одной файловой системы - атомарный rename за O(1),
+        # между устройствами - копирование со сверкой и только потом удаление источника
+        progress = progress or (lambda nbytes, nfiles: None)
+        # rename молча заменил бы файл, а копирование слилось бы с существующей папкой:
+        # существующая цель убирается заранее через подтверждение и set_aside
+        if os.path.lexists(target):
+            raise FileExistsError(errno.EEXIST, f"Объект {target} уже существует", target)
+        if self.same_device(source, os.path.dirname(target)):
+            try:
+                os.rename(source, target)
+                logging.info(f"Перемещение переименованием: {source} -> {target}")
+                return 'rename'
+            except OSError as e:
+                if e.errno in (errno.EEXIST, errno.ENOTEMPTY):
+                    raise
+                logging.info(f"Переименование {source} не удалось ({e}), выполняется копирование")
+
+        if os.path.isdir(source) and not os.path.islink(source):
+            self.copy_engine.copy_tree(source, target, progress, checkpoint, verify=True)
+            shutil.rmtree(source)
+        elif os.path.islink(source):
+            os.symlink(os.readlink(source), target)
+            os.remove(source)
+            progress(0, 1)
+        else:
+            self.copy_engine.copy_file(source, target, progress, checkpoint, verify=True)
+            os.remove(source)
+        logging.info(f"Перемещение копированием: {source} -> {target}")
+        return 'copy'
+
+    def set_aside(self, path):
+        # Заменяемый объект мгновенно убирается под скрытое имя рядом, удалить его можно в фоне
+        aside = os.path.join(os.path.dirname(path), f'.{os.path.basename(path)}.replaced-{time.time_ns()}')
+        os.rename(path, aside)
+        return aside
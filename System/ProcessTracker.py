@@ -0,0 +1,99 @@
+import logging
+import os
+import threading
+
+import psutil
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class ProcessTracker(QObject):
+    # Появившиеся процессы [(pid, имя, время создания)] и завершившиеся [pid]
+    processesChanged = pyqtSignal(list, list)
+
+    def __init__(self, interval=2.0, parent=None):
+        super().__init__(parent)
+        self.interval = interval
+        self.excluded = {os.getpid()}
+        # pid -> (psutil.Process, имя, время создания). Процесс определяется парой pid и времени
+        # создания; у процессов без доступа неизвестное имя или время хранится как None
+        self.processes = {}
+        self.lock = threading.Lock()
+        # refresh() из фонового потока и verify() из потока GUI не должны сообщить
+        # об одном и том же появлении дважды
+        self.update_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def refresh(self):
+        # Список pid - это одно чтение /proc, поэтому цена обновления зависит от числа
+        # появившихся и завершившихся процессов, а не от их общего числа. Повторное
+        # использование pid здесь не проверяется: это делает verify() перед показом отчета
+        with self.update_lock:
+            pids = set(psutil.pids()) - self.excluded
+            with self.lock:
+                known = set(self.processes)
+            return self._apply([pid for pid in known if pid not in pids], sorted(pids - known))
+
+    def verify(self):
+        # Сверяет время создания у запомненных процессов. pid, занятый другим процессом,
+        # сообщается как завершение и появление; стоит O(всех процессов), поэтому
+        # вызывается только когда список действительно нужен пользователю
+        with self.update_lock:
+            with self.lock:
+                known = dict(self.processes)
+            reused = sorted(pid for pid, (process, _, _) in known.items() if not process.is_running())
+            return self._apply(reused, reused)
+
+    def _apply(self, removed, new_pids):
+        added = []
+        cached = {}
+        for pid in new_pids:
+            try:
+                process = psutil.Process(pid)
+                with process.oneshot():
+                    name = self._attribute(process.name)
+                    create_time = self._attribute(process.create_time)
+            except psutil.NoSuchProcess:
+                continue
+            cached[pid] = (process, name, create_time)
+            added.append((pid, name, create_time))
+        with self.lock:
+            for pid in removed:
+                self.processes.pop(pid, None)
+            self.processes.update(cached)
+        return added, removed
+
+    @staticmethod
+    def _attribute(getter):
+        # Процесс без доступа или зомби запоминается с тем, что удалось узнать,
+        # иначе он запрашивался бы заново при каждом обновлении
+        try:
+            return getter()
+        except (psutil.AccessDenied, psutil.ZombieProcess):
+            return None
+
+    def snapshot(self):
+        with self.lock:
+            return [(pid, name, create_time) for pid, (_, name, create_time) in sorted(self.processes.items())]
+
+    def start(self):
+        if self.thread is None:
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self.run, name='process-tracker', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                added, removed = self.refresh()
+            except Exception as e:
+                logging.error(f"Ошибка отслеживания процессов: {e}")
+                continue
+            if added or removed:
+                self.processesChanged.emit(added, removed)
@@ -0,0 +1,59 @@
+import logging
+import os
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class RefreshScheduler(QObject):
+    # Пути можно планировать из любого потока: сигнал доставит их в поток GUI
+    pathsScheduled = pyqtSignal(list)
+
+    def __init__(self, model, interval=16, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.dirty_paths = set()
+        self.requested = 0
+        self.refreshed = 0
+        self.batches = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.flush)
+        self.pathsScheduled.connect(self.enqueue)
+
+    @property
+    def coalesced(self):
+        return self.requested - self.refreshed
+
+    def schedule(self, paths):
+        self.pathsScheduled.emit([os.path.normpath(path) for path in paths])
+
+    def enqueue(self, paths):
+        self.requested += len(paths)
+        self.dirty_paths.update(paths)
+        # Таймер не перезапускается, чтобы длинная серия не откладывала обновление бесконечно
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        if not self.dirty_paths:
+            return
+        paths, covering = self.merge(self.dirty_paths)
+        self.dirty_paths = set()
+        self.batches += 1
+        self.refreshed += len(paths)
+        self.model.refreshPaths(paths, recursive=covering)
+        logging.info(f"Пакетное обновление модели: {len(paths)} путей, "
+                     f"всего объединено {self.coalesced} из {self.requested}")
+
+    def merge(self, paths):
+        # Пути внутри уже запланированного поддерева поглощаются им.
+        # Возвращает оставшиеся пути и те из них, которые поглотили другие
+        merged = []
+        covering = set()
+        for path in sorted(paths, key=lambda p: p.split(os.sep)):
+            if merged and path.startswith(merged[-1].rstrip(os.sep) + os.sep):
+                covering.add(merged[-1])
+                continue
+            merged.append(path)
+        return merged, covering
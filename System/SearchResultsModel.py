@@ -0,0 +1,40 @@
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+
+
+class SearchResultsModel(QAbstractListModel):
+    PathRole = Qt.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.results = []
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.results)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        path, text = self.results[index.row()]
+        if role == Qt.DisplayRole:
+            return text
+        if role in (Qt.ToolTipRole, self.PathRole):
+            return path
+        return None
+
+    def appendResults(self, results):
+        if not results:
+            return
+        first = len(self.results)
+        self.beginInsertRows(QModelIndex(), first, first + len(results) - 1)
+        self.results.extend(results)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.results = []
+        self.endResetModel()
+
+    def path(self, row):
+        return self.results[row][0]
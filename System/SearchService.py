@@ -0,0 +1,65 @@
+import logging
+import threading
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class SearchService(QObject):
+    # Номер поиска и пачка результатов (путь, текст)
+    resultsFound = pyqtSignal(int, list)
+    # Номер поиска, время до первого результата (-1, если результатов нет), общее время, число результатов
+    searchFinished = pyqtSignal(int, float, float, int)
+
+    def __init__(self, batch_size=200, batch_interval=0.05, parent=None):
+        super().__init__(parent)
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.generation = 0
+        self.cancel_event = None
+
+    def start(self, results):
+        # results - функция, принимающая событие отмены и возвращающая итератор результатов.
+        # Новый поиск отменяет выполняющийся
+        self.cancel()
+        self.generation += 1
+        self.cancel_event = threading.Event()
+        thread = threading.Thread(target=self._run, args=(self.generation, results, self.cancel_event),
+                                  name=f'search-{self.generation}', daemon=True)
+        thread.start()
+        return self.generation
+
+    def cancel(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+
+    def _run(self, generation, results, cancel_event):
+        started = time.monotonic()
+        first_result = -1.0
+        count = 0
+        batch = []
+        last_flush = started
+        try:
+            for result in results(cancel_event):
+                if cancel_event.is_set():
+                    logging.info(f"Поиск {generation} отменен")
+                    return
+                if first_result < 0:
+                    first_result = time.monotonic() - started
+                batch.append(result)
+                count += 1
+                now = time.monotonic()
+                # Первый результат отправляется сразу, дальше - пачками
+                if count == 1 or len(batch) >= self.batch_size or now - last_flush >= self.batch_interval:
+                    self.resultsFound.emit(generation, batch)
+                    batch = []
+                    last_flush = now
+        except Exception as e:
+            logging.error(f"Ошибка поиска {generation}: {e}")
+        if cancel_event.is_set():
+            return
+        if batch:
+            self.resultsFound.emit(generation, batch)
+        total = time.monotonic() - started
+        logging.info(f"Поиск {generation}: {count} результатов, первый через {first_result:.3f} с, всего {total:.3f} с")
+        self.searchFinished.emit(generation, first_result, total, count)
@@ -1,26 +1,118 @@
-from multiprocessing import Semaphore, Lock
+import errno
+import os
+import struct
+import tempfile
+import time
+from multiprocessing import Lock
 
 from FileMapping import FileMapping
 
+# Путь по умолчанию не зависит от рабочего каталога, чтобы к нему могли подключаться другие процессы
+DEFAULT_PATH = os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+                            'superapp-telemetry')
+
+# Заголовок файла, little-endian, 32 байта:
+#   0  magic        4s  b'SAPS'
+#   4  version      H   версия разметки, меняется при несовместимых изменениях
+#   6  header_size  H   смещение данных от начала файла
+#   8  sequence     Q   счетчик seqlock: нечетный - идет запись, после записи увеличен на 2
+#   16 payload_size Q   размер данных после заголовка
+#   24 резерв       8 байт
+# Данные читаются по смещениям относительно header_size
+MAGIC = b'SAPS'
+LAYOUT_VERSION = 1
+HEADER = struct.Struct('<4sHHQQ8x')
+SEQUENCE = struct.Struct('<Q')
+SEQUENCE_OFFSET = 8
+# Сколько читатель ждет завершения записи, прежде чем сдаться, в секундах
+READ_TIMEOUT = 0.5
+
 
 class SharedMemoryManager:
-    def __init__(self, filename, size):
-        self.file_mapping = FileMapping(filename, size)
-        self.semaphore = Semaphore(1)
+    # Писатель увеличивает счетчик до и после записи, читатели блокировок не берут
+    # и повторяют чтение, если счетчик был нечетным или изменился за время чтения.
+    # С attach=True подключается к файлу, созданному другим процессом, только для чтения
+    def __init__(self, filename=DEFAULT_PATH, size=None, attach=False):
+        if attach:
+            self.file_mapping = FileMapping(filename, create=False)
+            if self.file_mapping.size >= HEADER.size:
+                magic, version, header_size, _, size = HEADER.unpack_from(self.file_mapping.mmap, 0)
+            else:
+                magic = version = header_size = None
+            if magic != MAGIC or version != LAYOUT_VERSION or header_size != HEADER.size:
+                self.file_mapping.close()
+                raise ValueError(f"{filename} не является сегментом телеметрии SuperApp версии {LAYOUT_VERSION}")
+        else:
+            header = HEADER.pack(MAGIC, LAYOUT_VERSION, HEADER.size, 0, size)
+            self.file_mapping = FileMapping(filename, HEADER.size + size, header=header)
+        self.size = size
         self.lock = Lock()
 
+    def version(self):
+        return SEQUENCE.unpack_from(self.file_mapping.mmap, SEQUENCE_OFFSET)[0]
+
+    def replaced(self):
+        # Писатель перезапустился и создал новый файл: нужно подключиться заново
+        return self.file_mapping.replaced()
+
     def write(self, data, offset=0):
+        self.write_many([(offset, data)])
+
+    def write_many(self, parts):
+        # Несколько фрагментов (смещение, данные) публикуются одной версией.
+        # Блокировка нужна только для исключения нескольких писателей
         with self.lock:
-            self.semaphore.acquire()
+            sequence = self.version()
+            SEQUENCE.pack_into(self.file_mapping.mmap, SEQUENCE_OFFSET, sequence + 1)
             try:
-                self.file_mapping.write(data, offset)
+                for offset, data in parts:
+                    self.file_mapping.write(data, HEADER.size + offset)
             finally:
-                self.semaphore.release()
+                # Даже после ошибки счетчик снова четный, иначе читатели ждали бы до READ_TIMEOUT
+                SEQUENCE.pack_into(self.file_mapping.mmap, SEQUENCE_OFFSET, sequence + 2)
 
     def read(self, size, offset=0):
+        return self._read(size, offset)[1]
+
+    def read_if_changed(self, last_version, size, offset=0):
+        # Возвращает (версия, данные) или (last_version, None), если с прошлого чтения ничего не менялось
+        if self.version() == last_version:
+            return last_version, None
+        return self._read(size, offset)
+
+    def read_with(self, size, offset, reader):
+        # Чтение без копирования: reader получает memoryview отображения и должен
+        # закончить с ним до возврата; при конкурентной записи reader вызывается повторно
+        def read():
+            with self.file_mapping.view(size, HEADER.size + offset) as view:
+                return reader(view)
+
+        return self._consistent(read)[1]
+
+    def _read(self, size, offset):
+        return self._consistent(lambda: self.file_mapping.read(size, HEADER.size + offset))
+
+    def _consistent(self, read):
+        # Возвращает (версия, read()) для чтения, за время которого счетчик был четным и не менялся.
+        # Писатель, завершившийся посреди записи, оставляет счетчик нечетным навсегда, поэтому
+        # ожидание ограничено: если файл заменен новым писателем - ESTALE, иначе - TimeoutError
+        deadline = None
+        while True:
+            before = self.version()
+            if before % 2 == 0:
+                result = read()
+                if self.version() == before:
+                    return before, result
+            if self.file_mapping.replaced():
+                raise OSError(errno.ESTALE, "Сегмент телеметрии заменен, нужно подключиться заново")
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + READ_TIMEOUT
+            elif now >= deadline:
+                raise TimeoutError(errno.ETIMEDOUT, f"Запись в сегмент телеметрии не завершилась за {READ_TIMEOUT} с")
+            # Писатель в середине записи: уступаем процессор и читаем снова
+            time.sleep(0)
+
+    def close(self):
         with self.lock:
-            self.semaphore.acquire()
-            try:
-                return self.file_mapping.read(size, offset)
-            finally:
-                self.semaphore.release()
\ No newline at end of file
+            self.file_mapping.close()
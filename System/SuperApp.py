@@ -1,24 +1,39 @@
 import logging
 import os
-import shutil
 import subprocess
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import psutil
 from PyQt5.QtGui import QKeySequence
 from PyQt5.QtWidgets import (
     QMainWindow, QTreeView, QVBoxLayout, QWidget, QAction,
     QMenu, QMessageBox, QInputDialog, QLineEdit, QPushButton, QToolBar, QShortcut, QApplication, QTextEdit,
-    QAbstractItemView, QFileDialog,
+    QAbstractItemView, QFileDialog, QListView, QComboBox, QProgressBar,
 )
-from PyQt5.QtCore import QModelIndex, Qt, QTimer
+from PyQt5.QtCore import Qt
 
+from ContentSearch import ContentSearch
 from CustomFileSystemModel import CustomFileSystemModel
 from DeviceHandler import DeviceHandler
+from DuplicateFinder import DuplicateFinder
+from FileOperationQueue import FileOperationQueue
+from FilenameIndex import FilenameIndex
+from InotifyWatcher import InotifyWatcher
 from MemoryTaskWindow import MemoryTaskWindow
-from SharedMemoryManager import SharedMemoryManager
+from MetricsRing import MetricsRing
+from MetricsSampler import MetricsSampler
+from ProcessTracker import ProcessTracker
+from RefreshScheduler import RefreshScheduler
+from SearchResultsModel import SearchResultsModel
+from SearchService import SearchService
+from SharedMemoryManager import SharedMemoryManager, DEFAULT_PATH
+from TelemetryRecord import TelemetryRecord
 from TerminalWindow import TerminalWindow
 from TreeView import TreeView
+from TrashJournal import TrashJournal
+from TrashQuota import TrashQuota
+from TrashReclaimer import TrashReclaimer
+from TreeWalker import TreeWalker
 from USBManager import USBManager
 
 logging.basicConfig(filename='super_app.log', level=logging.INFO, format='%(asctime)s - %(message)s')
@@ -28,23 +43,76 @@ class SuperApp(QMainWindow):
         super().__init__()
 
         self.original_paths = {}
-        self.clipboard_path = None
+        self.clipboard_paths = []
+        self.tree_walker = TreeWalker()
+        self.content_search = ContentSearch(walker=self.tree_walker)
+        self.duplicate_finder = DuplicateFinder(walker=self.tree_walker)
+        self.file_operations = FileOperationQueue(self.tree_walker,
+                                                  transfer_journals='/home/dan/Superapp/.transfers')
+        self.file_operations.jobProgress.connect(self.onJobProgress)
+        self.file_operations.jobFinished.connect(self.onJobFinished)
+        self.file_operations.batchFinished.connect(self.onBatchFinished)
+        self.file_operations.jobFailed.connect(self.onJobFailed)
+        self.current_job = None
+        self.paused_jobs = set()
+        self.cancelled_jobs = set()
+        # id пакета удаления -> пути в корзине, записи которых снимаются по его завершении
+        self.trash_removals = {}
 
         self.initUI()
         self.createTaskAction()
-
-        self.memory_manager = SharedMemoryManager('memory_info.txt', 1024)
+        self.process_tracker = ProcessTracker(parent=self)
+        self.process_tracker.processesChanged.connect(self.onProcessesChanged)
+        self.process_lines = {}
+
+        # За последней записью телеметрии в том же файле лежит история замеров.
+        # Внешние процессы читают этот файл через TelemetryReader
+        self.memory_manager = SharedMemoryManager(DEFAULT_PATH, TelemetryRecord.SIZE + MetricsRing.size())
+        self.metrics_ring = MetricsRing(self.memory_manager, offset=TelemetryRecord.SIZE)
         self.memory_task_window_1 = MemoryTaskWindow()
-        self.memory_task_window_1.set_memory_manager(self.memory_manager)
+        self.memory_task_window_1.set_memory_manager(self.memory_manager, self.metrics_ring)
         self.memory_task_window_2 = MemoryTaskWindow()
-        self.memory_task_window_2.set_memory_manager(self.memory_manager)
-
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.executeTask)
-        self.timer.start(1000)
+        self.memory_task_window_2.set_memory_manager(self.memory_manager, self.metrics_ring)
+
+        # Замеры идут в отдельном потоке: память опрашивается раз в секунду, пока открыто
+        # окно с показателями, и раз в 10 секунд без него; размеры окна и экрана приходят из событий
+        self.metrics_sampler = MetricsSampler(self.publishMetrics, parent=self)
+        self.metrics_sampler.changed.connect(self.onMetricsChanged)
+        self.metrics_sampler.add_metric('memory_percent', lambda: psutil.virtual_memory().percent, 1, 10)
+        for window in (self.memory_task_window_1, self.memory_task_window_2):
+            window.visibilityChanged.connect(
+                lambda visible, window=window: self.metrics_sampler.set_consumer(window, visible))
+        screen = QApplication.primaryScreen()
+        screen.geometryChanged.connect(lambda geometry: self.metrics_sampler.set_value(
+            'screen_size', (geometry.width(), geometry.height())))
+        self.metrics_sampler.set_value('screen_size', (screen.size().width(), screen.size().height()))
+        self.metrics_sampler.set_value('app_size', (self.width(), self.height()))
+        self.metrics_sampler.start()
 
         self.original_paths = {}
         self.app_directory = '/home/dan/Superapp'
+        self.trash_journal = TrashJournal(os.path.join(self.app_directory, 'Корзина'),
+                                          os.path.join(self.app_directory, '.trash_journal'))
+        self.trash_reclaimer = TrashReclaimer(os.path.join(self.app_directory, '.trash_staging'), parent=self)
+        self.trash_reclaimer.reclaimed.connect(self.onTrashReclaimed)
+        self.trash_reclaimer.resume()
+        self.trash_quota = TrashQuota(max_bytes=10 * 1024 ** 3, max_age=30 * 24 * 60 * 60)
+        self.enforceTrashQuota()
+
+        self.filename_index = FilenameIndex(self.tree_walker, ignored=[
+            self.trash_reclaimer.staging_path, self.file_operations.copy_engine.chunked.journal_directory])
+        self.filename_index.build(self.app_directory)
+
+        self.fs_watcher = InotifyWatcher(ignored=[
+            self.trash_reclaimer.staging_path, self.file_operations.copy_engine.chunked.journal_directory],
+            parent=self)
+        self.fs_watcher.directoryChanged.connect(
+            lambda directory, name, mask: self.refresh_scheduler.schedule([directory]))
+        self.fs_watcher.directoryChanged.connect(
+            lambda directory, name, mask: self.filename_index.update(os.path.join(directory, name)))
+        self.fs_watcher.overflow.connect(lambda: self.filename_index.build(self.app_directory))
+        self.fs_watcher.overflow.connect(self.model.onWatcherOverflow)
+        self.fs_watcher.watch(self.app_directory)
 
         self.device_handler = DeviceHandler()
         self.usb_manager = USBManager(self)
@@ -100,12 +168,13 @@ class SuperApp(QMainWindow):
         self.tree.setContextMenuPolicy(Qt.CustomContextMenu)
         self.tree.customContextMenuRequested.connect(self.showContextMenu)
 
-        self.tree.setSelectionMode(self.tree.SingleSelection)
+        self.tree.setSelectionMode(self.tree.ExtendedSelection)
         self.tree.setDragDropMode(QAbstractItemView.InternalMove)
         self.tree.setDragEnabled(True)
         self.tree.setAcceptDrops(True)
         self.tree.setDropIndicatorShown(True)
         self.model.setReadOnly(False)
+        self.refresh_scheduler = RefreshScheduler(self.model, parent=self)
 
         self.setAcceptDrops(True)
 
@@ -113,12 +182,33 @@ class SuperApp(QMainWindow):
         layout = QVBoxLayout()
         layout.addWidget(self.tree)
 
+        self.search_service = SearchService(parent=self)
+        self.search_service.resultsFound.connect(self.onSearchResults)
+        self.search_service.searchFinished.connect(self.onSearchFinished)
+        self.search_generation = 0
+        self.duplicates_root = None
+        self.searchResultsModel = SearchResultsModel(self)
+        self.searchResults = QListView()
+        self.searchResults.setModel(self.searchResultsModel)
+        self.searchResults.setUniformItemSizes(True)
+        self.searchResults.activated.connect(self.openSearchResult)
+        self.searchResults.clicked.connect(self.openSearchResult)
+        self.searchResults.hide()
+        layout.addWidget(self.searchResults)
+
         toolbar = QToolBar()
         self.addToolBar(Qt.TopToolBarArea, toolbar)
 
         self.searchInput = QLineEdit()
         self.searchInput.setPlaceholderText("Поиск по имени файла")
         toolbar.addWidget(self.searchInput)
+        self.searchInput.returnPressed.connect(self.searchItem)
+
+        self.searchMode = QComboBox()
+        self.searchMode.addItem("По имени")
+        self.searchMode.addItem("По содержимому")
+        self.searchMode.currentIndexChanged.connect(self.onSearchModeChanged)
+        toolbar.addWidget(self.searchMode)
 
         self.searchButton = QPushButton("Поиск")
         toolbar.addWidget(self.searchButton)
@@ -135,6 +225,17 @@ class SuperApp(QMainWindow):
         self.processes_output = QTextEdit()
         layout.addWidget(self.processes_output)
 
+        # Ход фоновых файловых операций
+        self.operationProgress = QProgressBar()
+        self.operationProgress.setMaximumWidth(200)
+        self.pauseOperationButton = QPushButton("Пауза")
+        self.pauseOperationButton.clicked.connect(self.toggleOperationPause)
+        self.cancelOperationButton = QPushButton("Отмена")
+        self.cancelOperationButton.clicked.connect(self.cancelOperation)
+        for widget in (self.operationProgress, self.pauseOperationButton, self.cancelOperationButton):
+            self.statusBar().addPermanentWidget(widget)
+            widget.hide()
+
         # Горячие клавиши
         shortcut_action = QAction("Горячие клавиши", self)
         shortcut_action.triggered.connect(self.show_shortcuts)
@@ -239,28 +340,30 @@ class SuperApp(QMainWindow):
         self.memory_task_window_1.show()
         self.memory_task_window_2.show()
 
-    def executeTask(self):
-        memory_usage = psutil.virtual_memory().percent
-        app_width = self.width()
-        app_height = self.height()
-        screen_width = QApplication.primaryScreen().size().width()
-        screen_height = QApplication.primaryScreen().size().height()
-        data = (f'Процент используемой физической памяти: {memory_usage}%\n'
-                f'Ширина и высота рамки приложения: {app_width}x{app_height}\n'
-                f'Ширина и высота рамки экрана: {screen_width}x{screen_height}').encode('utf-8')
-        self.memory_manager.write(data)
+    def publishMetrics(self, values, sampled):
+        # Вызывается в потоке замеров, поэтому к виджетам не обращается
+        app_width, app_height = values.get('app_size', (0, 0))
+        screen_width, screen_height = values.get('screen_size', (0, 0))
+        record = TelemetryRecord(values.get('memory_percent', 0.0), app_width, app_height,
+                                 screen_width, screen_height)
+        self.memory_manager.write(record.pack())
+        if 'memory_percent' in sampled:
+            self.metrics_ring.append(record.timestamp, record.memory_percent)
+
+    def onMetricsChanged(self):
         if self.memory_task_window_1.isVisible():
             self.memory_task_window_1.update_info()
         if self.memory_task_window_2.isVisible():
             self.memory_task_window_2.update_info()
 
-    def displayMemoryInfo(self):
-        data = self.memory_manager.read(1024).decode('utf-8')
-        self.processes_output.setPlainText(data)
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if hasattr(self, 'metrics_sampler'):
+            self.metrics_sampler.set_value('app_size', (event.size().width(), event.size().height()))
 
     def displayMemoryInfo(self):
-        data = self.memory_manager.read(1024).decode('utf-8')
-        self.processes_output.setPlainText(data)
+        record = TelemetryRecord.unpack(self.memory_manager.read(TelemetryRecord.SIZE))
+        self.processes_output.setPlainText(MemoryTaskWindow.format_record(record))
 
     def handle_device_event(self, action, device):
         logging.info(f'Событие USB: {action}, устройство: {device}')
@@ -275,55 +378,44 @@ class SuperApp(QMainWindow):
 
             self.original_paths[device_path] = device_directory
             if self.model:
-                self.model.setRootPath('')
-                self.model.setRootPath(app_directory)
+                self.refresh_scheduler.schedule([device_directory])
+            # Передачи, прерванные извлечением устройства, продолжаются с последнего проверенного блока
+            resumed = self.file_operations.resume_transfers(device_directory)
+            if resumed:
+                logging.info(f"Продолжено прерванных передач на {device_name}: {len(resumed)}")
             QMessageBox.information(None, 'Подключено устройство', f"Устройство: {device_name} ({device_path})")
 
         elif action == 'remove':
             device_path = device.device_node
             if device_path in self.original_paths:
                 device_directory = self.original_paths.pop(device_path)
-                shutil.rmtree(device_directory, ignore_errors=True)
+                # Папка не удаляется вместе с содержимым: в ней могут быть недописанные
+                # файлы передач, которые продолжатся при повторном подключении
+                try:
+                    os.rmdir(device_directory)
+                except OSError:
+                    pass
                 if self.model:
-                    self.model.setRootPath('')
-                    self.model.setRootPath('/home/dan/Superapp')
+                    self.refresh_scheduler.schedule([device_directory])
                 QMessageBox.information(None, 'Отключено устройство', f"Устройство: {os.path.basename(device_directory)} ({device_path})")
 
 
     def trackProcesses(self):
         logging.info("Отслеживание процессов ОС вне ПО")
-        all_processes = psutil.process_iter()
-
-        our_pid = os.getpid()
-
-        other_processes = []
-
-        for process in all_processes:
-            try:
-                process_info = process.as_dict(attrs=['pid', 'name', 'create_time'])
-                pid = process_info['pid']
-                process_name = process_info['name']
-                create_time = datetime.fromtimestamp(process_info['create_time']).strftime('%Y-%m-%d %H:%M:%S')
-
-                if pid != our_pid:
-                    other_processes.append((pid, process_name, create_time))
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
-
-        self.processes_output.clear()
-
-        log_lines = []
-        if other_processes:
-            self.processes_output.append("Процессы ОС (без собственных):")
-            log_lines.append("Процессы ОС (без собственных):")
-            for pid, process_name, create_time in other_processes:
-                process_info_line = f"PID: {pid}, Имя процесса: {process_name}, Время создания: {create_time}"
-                self.processes_output.append(process_info_line)
-                log_lines.append(process_info_line)
+        # Первый вызов получает полный список, дальше трекер в фоне сообщает только об изменениях
+        if self.process_tracker.thread is None:
+            self.process_tracker.refresh()
+            self.process_lines = {pid: self.formatProcess(pid, name, create_time)
+                                  for pid, name, create_time in self.process_tracker.snapshot()}
+            self.process_tracker.start()
         else:
-            no_processes_message = "В данный момент нет других процессов ОС."
-            self.processes_output.append(no_processes_message)
-            log_lines.append(no_processes_message)
+            # Фоновые обновления сверяют только список pid; перед отчетом проверяется,
+            # что за каждым pid по-прежнему тот же процесс
+            added, removed = self.process_tracker.verify()
+            if added or removed:
+                self.onProcessesChanged(added, removed)
+        log_lines = self.processReport()
+        self.processes_output.setPlainText("\n".join(log_lines))
 
         # Ask user for the name of the log file
         file_path, _ = QFileDialog.getSaveFileName(self, "Сохранить отчет", "", "Текстовый файл (*.txt)")
@@ -331,6 +423,25 @@ class SuperApp(QMainWindow):
             with open(file_path, 'w', encoding='utf-8') as log_file:
                 log_file.write("\n".join(log_lines))
 
+    def formatProcess(self, pid, process_name, create_time):
+        # Имя или время создания недоступны для чужих процессов без прав
+        process_name = process_name if process_name is not None else 'нет доступа'
+        create_time = datetime.fromtimestamp(create_time).strftime('%Y-%m-%d %H:%M:%S') if create_time is not None else 'нет доступа'
+        return f"PID: {pid}, Имя процесса: {process_name}, Время создания: {create_time}"
+
+    def processReport(self):
+        if not self.process_lines:
+            return ["В данный момент нет других процессов ОС."]
+        return ["Процессы ОС (без собственных):"] + [self.process_lines[pid] for pid in sorted(self.process_lines)]
+
+    def onProcessesChanged(self, added, removed):
+        # Строки форматируются только для новых процессов
+        for pid in removed:
+            self.process_lines.pop(pid, None)
+        for pid, process_name, create_time in added:
+            self.process_lines[pid] = self.formatProcess(pid, process_name, create_time)
+        self.processes_output.setPlainText("\n".join(self.processReport()))
+
     def show_shortcuts(self):
         logging.info("Показ горячих клавиш")
         QMessageBox.information(self, 'Горячие клавиши',
@@ -420,6 +531,9 @@ class SuperApp(QMainWindow):
             clearTrashAction = QAction('Очистить корзину', self)
             clearTrashAction.triggered.connect(self.clearTrash)
             self.contextMenu.addAction(clearTrashAction)
+            trashContentsAction = QAction('Содержимое корзины', self)
+            trashContentsAction.triggered.connect(self.showTrashContents)
+            self.contextMenu.addAction(trashContentsAction)
         else:
             if filePath.startswith('/home/dan/Superapp/Корзина'):
                 restoreAction = QAction('Восстановить CTRL + I', self)
@@ -470,6 +584,8 @@ class SuperApp(QMainWindow):
                     copyAction.triggered.connect(self.copyItem)
                     pasteAction = QAction('Вставить CTRL + V', self)
                     pasteAction.triggered.connect(self.pasteItem)
+                    findDuplicatesAction = QAction('Найти дубликаты', self)
+                    findDuplicatesAction.triggered.connect(lambda: self.findDuplicates(filePath))
                     self.contextMenu.addAction(createFolderAction)
                     self.contextMenu.addAction(createFileAction)
                     self.contextMenu.addAction(renameAction)
@@ -477,6 +593,7 @@ class SuperApp(QMainWindow):
                     self.contextMenu.addAction(deleteImmediatelyAction)
                     self.contextMenu.addAction(copyAction)
                     self.contextMenu.addAction(pasteAction)
+                    self.contextMenu.addAction(findDuplicatesAction)
 
         self.contextMenu.exec_(self.tree.mapToGlobal(pos))
 
@@ -489,8 +606,7 @@ class SuperApp(QMainWindow):
             if not os.path.exists(new_folder_path):
                 logging.info(f"Создана root папка: {new_folder_path}")
                 os.makedirs(new_folder_path)
-                self.model.setRootPath('')
-                self.model.setRootPath(rootPath)
+                self.refresh_scheduler.schedule([new_folder_path])
 
     def createRootFile(self):
         new_file_name, ok = QInputDialog.getText(self, "Создание файла в корневой директории", "Введите имя файла:")
@@ -499,8 +615,7 @@ class SuperApp(QMainWindow):
             new_file_path = os.path.join(rootPath, new_file_name)
             open(new_file_path, 'a').close()
             logging.info(f"Создан root файла: {new_file_path}")
-            self.model.setRootPath('')
-            self.model.setRootPath(rootPath)
+            self.refresh_scheduler.schedule([new_file_path])
 
     def createFolderItem(self):
         index = self.tree.currentIndex()
@@ -510,9 +625,7 @@ class SuperApp(QMainWindow):
         if ok and new_folder_name:
             os.makedirs(os.path.join(filePath, new_folder_name))
             logging.info(f"Создана папка: {os.path.join(filePath, new_folder_name)}")
-            rootPath = self.model.rootPath()
-            self.model.setRootPath('')
-            self.model.setRootPath(rootPath)
+            self.refresh_scheduler.schedule([os.path.join(filePath, new_folder_name)])
 
     def createFileItem(self):
         index = self.tree.currentIndex()
@@ -522,9 +635,7 @@ class SuperApp(QMainWindow):
         if ok and new_file_name:
             open(os.path.join(filePath, new_file_name), 'a').close()
             logging.info(f"Создан файл: {os.path.join(filePath, new_file_name)}")
-            rootPath = self.model.rootPath()
-            self.model.setRootPath('')
-            self.model.setRootPath(rootPath)
+            self.refresh_scheduler.schedule([os.path.join(filePath, new_file_name)])
 
     def renameItem(self):
         index = self.tree.currentIndex()
@@ -537,60 +648,131 @@ class SuperApp(QMainWindow):
 
         new_name, ok = QInputDialog.getText(self, "Переименование", "Введите новое имя:")
         if ok and new_name:
-            os.rename(filePath, os.path.join(os.path.dirname(filePath), new_name))
-            rootPath = self.model.rootPath()
+            new_path = os.path.join(os.path.dirname(filePath), new_name)
+            os.rename(filePath, new_path)
             logging.info(f"Переименование объекта: {filePath} to {new_name}")
-            self.model.setRootPath('')
-            self.model.setRootPath(rootPath)
+            self.refresh_scheduler.schedule([filePath, new_path])
+
+    def selectedPaths(self):
+        paths = [self.model.filePath(index) for index in self.tree.selectionModel().selectedRows(0)]
+        if not paths and self.tree.currentIndex().isValid():
+            paths = [self.model.filePath(self.tree.currentIndex())]
+        # Объекты внутри выбранной папки обрабатываются вместе с ней
+        result = []
+        for path in sorted(set(paths), key=lambda p: p.split(os.sep)):
+            if result and path.startswith(result[-1].rstrip(os.sep) + os.sep):
+                continue
+            result.append(path)
+        return result
+
+    def isProtected(self, paths):
+        return any(path.endswith('/System') or path.endswith('/Корзина') for path in paths)
 
     def deleteItem(self):
-        index = self.tree.currentIndex()
-        filePath = self.model.filePath(index)
+        paths = self.selectedPaths()
 
-        if filePath.endswith('/System') or filePath.endswith('/Корзина'):
+        if self.isProtected(paths):
             QMessageBox.warning(self, 'Ошибка', 'Эту папку нельзя удалить!')
-            logging.warning(f"Ошибка удаление защищенного объекта: {filePath}")
+            logging.warning(f"Ошибка удаление защищенного объекта: {paths}")
             return
 
-        trash_path = os.path.join('/home/dan/Superapp', 'Корзина')
-        trash_file_path = os.path.join(trash_path, os.path.basename(filePath))
+        touched_paths = []
+        trashed = []
+        too_large = []
+        unmeasured = []
+        for filePath in paths:
+            size = self.itemSize(filePath)
+            if size is not None and not self.trash_quota.fits(size):
+                too_large.append(filePath)
+                continue
+            trash_file_path = self.trash_journal.reserve(filePath)
+            try:
+                os.rename(filePath, trash_file_path)
+            except OSError as e:
+                self.trash_journal.release(trash_file_path)
+                QMessageBox.warning(self, 'Ошибка', f'Не удалось переместить {filePath} в корзину: {e}')
+                logging.error(f"Ошибка перемещения объекта в корзину: {filePath}: {e}")
+                continue
+            # В журнал попадают только действительно перемещенные объекты
+            trash_name = self.trash_journal.add(filePath, size or 0, trash_file_path)
+            logging.info(f"Перемещение объекта в корзину: {filePath} to {trash_file_path}")
+            touched_paths.extend([filePath, trash_file_path])
+            trashed.append(trash_name)
+            if size is None:
+                unmeasured.append((trash_name, trash_file_path))
+        self.refresh_scheduler.schedule(touched_paths)
+        self.enforceTrashQuota(keep=trashed)
+        for trash_name, trash_file_path in unmeasured:
+            self.model.size_engine.measure(
+                trash_file_path, lambda size, trash_name=trash_name: self.measureTrashItem(trash_name, size))
+
+        if too_large:
+            # Такой объект вытеснил бы всю корзину вместе с собой, поэтому спрашиваем явно
+            reply = QMessageBox.question(
+                self, 'Удаление', 'Объекты больше квоты корзины '
+                f'({self.model.formatSize(self.trash_quota.max_bytes)}) и не могут быть в нее перемещены:\n'
+                + '\n'.join(too_large) + '\n\nУдалить их безвозвратно?',
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply == QMessageBox.Yes:
+                self.file_operations.delete(too_large)
+                logging.info(f"Безвозвратное удаление объектов больше квоты корзины: {too_large}")
+
+    def enforceTrashQuota(self, keep=()):
+        evicted = self.trash_journal.evict(self.trash_quota, keep)
+        if evicted:
+            logging.info(f"Превышена квота корзины: вытесняется {len(evicted)} объектов, "
+                         f"{sum(entry['size'] for entry in evicted)} байт")
+            self.trash_reclaimer.evict([os.path.join(self.trash_journal.trash_path, entry['trash_name'])
+                                        for entry in evicted], self.onTrashItemEvicted)
+
+    def onTrashItemEvicted(self, path, error):
+        # Выполняется в потоке очистки: запись снимается с журнала только после того, как объект
+        # перенесен из корзины, иначе при сбое он остался бы в корзине вне учета квоты
+        trash_name = os.path.basename(path)
+        if error is None or isinstance(error, FileNotFoundError):
+            self.trash_journal.remove(trash_name)
+        else:
+            self.trash_journal.cancel_eviction(trash_name)
 
-        self.original_paths[trash_file_path] = filePath
+    def itemSize(self, path):
+        # Размер без обхода дерева в потоке GUI; None - размер папки еще неизвестен
+        if os.path.isdir(path) and not os.path.islink(path):
+            indexed = self.model.size_engine.index.lookup(path)
+            return indexed[0] if indexed else None
+        return os.lstat(path).st_size
 
-        os.rename(filePath, trash_file_path)
-        logging.info(f"Перемещение объекта в корзину: {filePath} to {trash_file_path}")
-        rootPath = self.model.rootPath()
-        self.model.setRootPath('')
-        self.model.setRootPath(rootPath)
+    def measureTrashItem(self, trash_name, size):
+        # Выполняется в потоке движка размеров для папок, размер которых не был известен
+        self.trash_journal.update_size(trash_name, size)
+        self.enforceTrashQuota(keep=[trash_name])
 
     def deleteImmediatelyItem(self):
-        index = self.tree.currentIndex()
-        filePath = self.model.filePath(index)
+        paths = self.selectedPaths()
 
-        if filePath.endswith('/System') or filePath.endswith('/Корзина'):
+        if self.isProtected(paths):
             QMessageBox.warning(self, 'Ошибка', 'Эту папку нельзя удалить!')
-            logging.warning(f"Ошбика быстрого удаления объекта: {filePath}")
+            logging.warning(f"Ошбика быстрого удаления объекта: {paths}")
             return
 
-        if os.path.isfile(filePath) or os.path.islink(filePath):
-            os.remove(filePath)
-            logging.info(f"Удален файл: {filePath}")
-        elif os.path.isdir(filePath):
-            shutil.rmtree(filePath)
-            logging.info(f"Удалена папка: {filePath}")
-
-        rootPath = self.model.rootPath()
-        self.model.setRootPath('')
-        self.model.setRootPath(rootPath)
+        paths = [path for path in paths if os.path.lexists(path)]
+        if paths:
+            batch_id = self.file_operations.delete(paths)
+            # Записи корзины снимаются только после того, как удаление действительно прошло
+            self.trash_removals[batch_id] = [path for path in paths
+                                             if os.path.dirname(path) == self.trash_journal.trash_path]
+            logging.info(f"Удаление объектов: {paths}")
 
     def restoreItem(self):
         index = self.tree.currentIndex()
         filePath = self.model.filePath(index)
 
-        original_path = self.original_paths.get(filePath, None)
-        if not original_path:
+        entry = None
+        if os.path.dirname(filePath) == self.trash_journal.trash_path:
+            entry = self.trash_journal.get(os.path.basename(filePath))
+        if not entry:
             QMessageBox.warning(self, 'Ошибка', 'Не удалось определить исходный путь файла!')
             return
+        original_path = entry['original_path']
 
         new_name, ok = QInputDialog.getText(self, "Восстановление",
                                             "Введите новое имя (или оставьте пустым для оригинального имени):")
@@ -610,9 +792,25 @@ class SuperApp(QMainWindow):
                 os.makedirs(parent_dir)
 
             os.rename(filePath, new_file_path)
-            rootPath = self.model.rootPath()
-            self.model.setRootPath('')
-            self.model.setRootPath(rootPath)
+            self.trash_journal.remove(entry['trash_name'])
+            logging.info(f"Восстановление объекта из корзины: {filePath} to {new_file_path}")
+            self.refresh_scheduler.schedule([filePath, new_file_path])
+
+    def showTrashContents(self):
+        entries, total_size = self.trash_journal.listing()
+        lines = [f"{datetime.fromtimestamp(entry['deleted_at']).strftime('%Y-%m-%d %H:%M:%S')}  "
+                 f"{entry['trash_name']}  ({self.model.formatSize(entry['size'])})  <- {entry['original_path']}"
+                 for entry in reversed(entries[-50:])]
+        if len(entries) > 50:
+            lines.append(f"... и еще {len(entries) - 50}")
+        QMessageBox.information(self, 'Содержимое корзины',
+                                f"Объектов: {len(entries)}, общий размер: {self.model.formatSize(total_size)}\n\n"
+                                + "\n".join(lines))
+
+    def onTrashReclaimed(self, freed, removed, elapsed):
+        self.statusBar().showMessage(
+            f'Корзина очищена: освобождено {self.model.formatSize(freed)}, удалено файлов: {removed}, '
+            f'{self.model.formatSize(freed / max(elapsed, 1e-6))}/с', 5000)
 
     def clearTrash(self):
         reply = QMessageBox.question(self, 'Очистить корзину',
@@ -620,81 +818,185 @@ class SuperApp(QMainWindow):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
             trash_path = os.path.join('/home/dan/Superapp', 'Корзина')
-            for filename in os.listdir(trash_path):
-                file_path = os.path.join(trash_path, filename)
-                if os.path.isfile(file_path) or os.path.islink(file_path):
-                    os.remove(file_path)
-                    logging.info(f"Удален файл из корзины: {file_path}")
-                elif os.path.isdir(file_path):
-                    shutil.rmtree(file_path)
-                    logging.info(f"Удалена папка из корзины: {file_path}")
-            rootPath = self.model.rootPath()
-            self.model.setRootPath('')
-            self.model.setRootPath(rootPath)
+            # Корзина целиком переименовывается в скрытую папку и сразу создается пустой,
+            # а содержимое удаляется в фоне
+            staged = self.trash_reclaimer.stage(trash_path)
+            os.makedirs(trash_path)
+            # Корзина создана заново по тому же пути, поэтому событие наблюдателя
+            # не удалит из индекса имен ее прежнее содержимое
+            self.filename_index.remove(trash_path)
+            self.filename_index.update(trash_path)
+            self.trash_journal.clear()
+            self.trash_reclaimer.reclaim(staged)
+            logging.info(f"Очистка корзины: содержимое перенесено в {staged}")
+            self.refresh_scheduler.schedule([trash_path])
         else:
             return
 
     def searchItem(self):
         search_text = self.searchInput.text().strip()
+        self.searchResultsModel.clear()
+        self.duplicates_root = None
         if not search_text:
-            rootPath = self.model.rootPath()
-            self.model.setRootPath('')
-            self.model.setRootPath(rootPath)
+            self.search_service.cancel()
+            self.searchResults.hide()
             logging.info("Создание результатов поиска")
             return
 
-        matches = self.findItems(search_text, Qt.MatchContains | Qt.MatchRecursive, 0)
-
-        if matches:
-            first_match = matches[0]
-            self.tree.setCurrentIndex(first_match)
-            self.tree.scrollTo(first_match)
-            logging.info(f"Поиск резултатов: {search_text}")
+        self.searchResults.show()
+        self.statusBar().showMessage(f'Поиск "{search_text}"...')
+        root = self.model.rootPath()
+        if self.searchMode.currentIndex() == 1:
+            self.search_generation = self.search_service.start(
+                lambda cancel_event: self.content_search.search(root, search_text, cancel_event))
         else:
-            QMessageBox.information(self, 'Поиск', f'Файл или папка с именем "{search_text}" не найдены.')
-            logging.info(f"Ошибка нахождения объектов: {search_text}")
-
-    def findItems(self, text, flags, column):
-        matches = []
-        stack = [self.model.index(0, 0, QModelIndex())]
+            self.search_generation = self.search_service.start(
+                lambda cancel_event: self.iterItems(search_text, root, cancel_event))
+        logging.info(f"Поиск резултатов: {search_text}")
+
+    def findDuplicates(self, root):
+        # Группы дубликатов выводятся в список результатов поиска по мере нахождения
+        self.searchResultsModel.clear()
+        self.searchResults.show()
+        self.duplicates_root = root
+        self.statusBar().showMessage(f'Поиск дубликатов в {root}...')
+        self.search_generation = self.search_service.start(
+            lambda cancel_event: self.duplicate_finder.search(root, cancel_event))
+        logging.info(f"Поиск дубликатов: {root}")
+
+    def onSearchModeChanged(self, mode):
+        if mode == 1:
+            self.searchInput.setPlaceholderText("Поиск по содержимому файлов")
+        else:
+            self.searchInput.setPlaceholderText("Поиск по имени файла")
 
-        while stack:
-            index = stack.pop()
-            if index.isValid():
-                text_data = self.model.data(index, Qt.DisplayRole)
-                if text_data and text in text_data:
-                    matches.append(index)
+    def iterItems(self, text, root, cancel_event):
+        if self.filename_index.ready.is_set():
+            paths = self.filename_index.search(text)
+        else:
+            # Индекс еще строится: обходим дерево напрямую
+            paths = (entry.path for entry in self.tree_walker.walk(root) if text in entry.name)
+        for path in paths:
+            if cancel_event.is_set():
+                return
+            yield path, os.path.relpath(path, root)
 
-                if self.model.hasChildren(index):
-                    for row in range(self.model.rowCount(index)):
-                        stack.append(self.model.index(row, 0, index))
+    def onSearchResults(self, generation, results):
+        if generation != self.search_generation:
+            return
+        first_batch = self.searchResultsModel.rowCount() == 0
+        self.searchResultsModel.appendResults(results)
+        if first_batch:
+            self.searchResults.setCurrentIndex(self.searchResultsModel.index(0))
+            self.openSearchResult(self.searchResultsModel.index(0))
+
+    def onSearchFinished(self, generation, first_result, total, count):
+        if generation != self.search_generation:
+            return
+        search_text = self.searchInput.text().strip()
+        if self.duplicates_root is not None:
+            if count:
+                self.statusBar().showMessage(f'Найдено файлов-дубликатов: {count}, '
+                                             f'поиск занял {total * 1000:.0f} мс')
+            else:
+                self.statusBar().clearMessage()
+                QMessageBox.information(self, 'Поиск дубликатов',
+                                        f'В папке "{self.duplicates_root}" дубликаты не найдены.')
+            return
+        if count:
+            self.statusBar().showMessage(f'Найдено: {count}, первый результат через {first_result * 1000:.0f} мс, '
+                                         f'поиск занял {total * 1000:.0f} мс')
+        else:
+            self.statusBar().clearMessage()
+            if self.searchMode.currentIndex() == 1:
+                QMessageBox.information(self, 'Поиск', f'Файлы, содержащие "{search_text}", не найдены.')
+            else:
+                QMessageBox.information(self, 'Поиск', f'Файл или папка с именем "{search_text}" не найдены.')
+            logging.info(f"Ошибка нахождения объектов: {search_text}")
 
-        return matches
+    def openSearchResult(self, result_index):
+        if not result_index.isValid():
+            return
+        index = self.model.index(self.searchResultsModel.path(result_index.row()))
+        if index.isValid():
+            self.tree.setCurrentIndex(index)
+            self.tree.scrollTo(index)
 
     def copyItem(self):
-        self.clipboard_path = self.model.filePath(self.tree.currentIndex())
-        self.original_paths = {self.clipboard_path: None}
-        logging.info(f"Скопирован объект: {self.clipboard_path}")
+        self.clipboard_paths = self.selectedPaths()
+        logging.info(f"Скопированы объекты: {self.clipboard_paths}")
 
     def pasteItem(self):
-        if not self.clipboard_path:
+        if not self.clipboard_paths:
             return
         destination_path = self.model.filePath(self.tree.currentIndex())
         if not destination_path or not os.path.isdir(destination_path):
             QMessageBox.warning(self, 'Ошибка', 'Выберите папку для вставки!')
             logging.warning("Операция вставка прервана: destination not selected or not a folder")
             return
-        if os.path.isfile(self.clipboard_path):
-            destination = os.path.join(destination_path, os.path.basename(self.clipboard_path))
-            shutil.copy2(self.clipboard_path, destination)
-            logging.info(f"Вставлен файл: {self.clipboard_path} to {destination}")
+        self.file_operations.copy(self.clipboard_paths, destination_path,
+                                  resumable=self.isDevicePath(destination_path))
+        logging.info(f"Вставка объектов: {self.clipboard_paths} to {destination_path}")
+
+    def isDevicePath(self, path):
+        # На съемные устройства копирование идет блоками с журналом
+        return any(os.path.commonpath([path, directory]) == directory
+                   for directory in self.original_paths.values())
+
+    def onJobProgress(self, job_id, bytes_done, bytes_total, files_done, files_total,
+                      bytes_per_second, files_per_second, eta):
+        self.current_job = job_id
+        for widget in (self.operationProgress, self.pauseOperationButton, self.cancelOperationButton):
+            widget.show()
+        self.operationProgress.setValue(int(bytes_done * 100 / bytes_total) if bytes_total else 0)
+        eta_text = str(timedelta(seconds=int(eta))) if eta >= 0 else '?'
+        self.statusBar().showMessage(
+            f'{self.model.formatSize(bytes_done)} из {self.model.formatSize(bytes_total)}, '
+            f'файлов {files_done} из {files_total}, {self.model.formatSize(bytes_per_second)}/с, '
+            f'{files_per_second:.0f} файлов/с, осталось {eta_text}')
+
+    def onJobFinished(self, job_id, touched_paths):
+        self.finishJob(job_id)
+        self.statusBar().showMessage('Операция завершена', 3000)
+
+    def onJobFailed(self, job_id, message, touched_paths):
+        self.finishJob(job_id)
+        self.statusBar().showMessage(message, 3000)
+        if job_id not in self.cancelled_jobs:
+            QMessageBox.critical(self, 'Ошибка', message)
+        self.cancelled_jobs.discard(job_id)
+
+    def onBatchFinished(self, batch_id, touched_paths):
+        for path in self.trash_removals.pop(batch_id, ()):
+            if not os.path.lexists(path):
+                self.trash_journal.remove(os.path.basename(path))
+        # Одно обновление модели на весь пакет операций
+        self.refresh_scheduler.schedule(touched_paths)
+
+    def finishJob(self, job_id):
+        self.paused_jobs.discard(job_id)
+        if self.current_job == job_id:
+            self.current_job = None
+        if not self.file_operations.active_jobs():
+            for widget in (self.operationProgress, self.pauseOperationButton, self.cancelOperationButton):
+                widget.hide()
+
+    def toggleOperationPause(self):
+        if self.current_job is None:
+            return
+        if self.current_job in self.paused_jobs:
+            self.paused_jobs.discard(self.current_job)
+            self.file_operations.resume(self.current_job)
+            self.pauseOperationButton.setText("Пауза")
         else:
-            destination = os.path.join(destination_path, os.path.basename(self.clipboard_path))
-            self.original_paths = {os.path.join(self.clipboard_path, f): os.path.join(destination, f) for f in os.listdir(self.clipboard_path)}
-            shutil.copytree(self.clipboard_path, destination)
-            logging.info(f"Вставлена папка: {self.clipboard_path} to {destination}")
-        self.model.setRootPath('')
-        self.model.setRootPath('/home/dan/Superapp')
+            self.paused_jobs.add(self.current_job)
+            self.file_operations.pause(self.current_job)
+            self.pauseOperationButton.setText("Продолжить")
+
+    def cancelOperation(self):
+        for job_id in self.file_operations.active_jobs():
+            self.cancelled_jobs.add(job_id)
+            self.file_operations.cancel(job_id)
 
         #####
 
@@ -729,35 +1031,47 @@ class SuperApp(QMainWindow):
         # Получаем список URL-адресов из MIME данных
         urls = event.mimeData().urls()
 
+        sources = []
+        replaced = []
         for url in urls:
             file_path = url.toLocalFile()
             file_name = os.path.basename(file_path)
             destination_path = os.path.join(destination_folder, file_name)
 
-            # Перемещаем или копируем файл в зависимости от настроек
+            # Перенос объекта в самого себя или на собственное место пропускается
+            if os.path.commonpath([file_path, destination_path]) == os.path.normpath(file_path):
+                continue
+
+            # Вопросы о перезаписи задаются сразу, само копирование идет в фоне
             if os.path.isfile(file_path):
                 if os.path.exists(destination_path):
                     reply = QMessageBox.question(self, 'Перезапись файла',
                                                  f'Файл {file_name} уже существует в папке назначения. Заменить?',
                                                  QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-                    if reply == QMessageBox.Yes:
-                        shutil.copy2(file_path, destination_path)
-                else:
-                    shutil.copy2(file_path, destination_path)
+                    if reply != QMessageBox.Yes:
+                        continue
+                    replaced.append(destination_path)
+                sources.append(file_path)
             elif os.path.isdir(file_path):
-                try:
-                    shutil.copytree(file_path, destination_path)
-                except FileExistsError:
+                if os.path.exists(destination_path):
                     reply = QMessageBox.question(self, 'Перезапись папки',
                                                  f'Папка {file_name} уже существует в папке назначения. Заменить?',
                                                  QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-                    if reply == QMessageBox.Yes:
-                        shutil.rmtree(destination_path)
-                        shutil.copytree(file_path, destination_path)
-
-        # После обработки каждого файла, обновляем виджет
-        self.model.setRootPath('')
-        self.model.setRootPath(destination_folder)
+                    if reply != QMessageBox.Yes:
+                        continue
+                    replaced.append(destination_path)
+                sources.append(file_path)
+
+        # Заменяемые объекты мгновенно убираются в сторону и удаляются в фоне,
+        # поэтому перемещение и копирование не пишут поверх существующей цели
+        if replaced:
+            self.file_operations.delete([self.file_operations.move_planner.set_aside(path) for path in replaced])
+        if sources:
+            if event.dropAction() == Qt.MoveAction:
+                self.file_operations.move(sources, destination_folder)
+            else:
+                self.file_operations.copy(sources, destination_folder,
+                                          resumable=self.isDevicePath(destination_folder))
 
         event.acceptProposedAction()
     def is_system_folder(self, folder_path):
@@ -788,13 +1102,6 @@ class SuperApp(QMainWindow):
                     self.target_directory = url.toLocalFile()
             event.acceptProposedAction()
 
-    def dropEvent(self, event):
-        if event.mimeData().hasUrls():
-            urls = event.mimeData().urls()
-            for url in urls:
-                file_path = url.toLocalFile()
-                print(file_path)
-
     def get_destination_folder(self, position):
         destination_index = self.tree.indexAt(position)
         destination_folder = self.model.filePath(destination_index)
@@ -806,6 +1113,16 @@ class SuperApp(QMainWindow):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
 
         if reply == QMessageBox.Yes:
+            self.search_service.cancel()
+            self.content_search.close()
+            self.duplicate_finder.close()
+            self.metrics_sampler.stop()
+            self.process_tracker.stop()
+            self.memory_manager.close()
+            self.fs_watcher.stop()
+            self.trash_journal.close()
+            self.trash_reclaimer.stop()
+            self.model.size_engine.shutdown()
             event.accept()
         else:
             event.ignore()
\ No newline at end of file
@@ -0,0 +1,88 @@
+import errno
+import json
+import sys
+import time
+
+from MetricsRing import MetricsRing
+from SharedMemoryManager import SharedMemoryManager, DEFAULT_PATH
+from TelemetryRecord import TelemetryRecord
+
+# Разметка данных сегмента (смещения от конца заголовка, см. SharedMemoryManager):
+#   0                      TelemetryRecord - последний замер
+#   TelemetryRecord.SIZE   MetricsRing - история замеров по уровням TIERS
+# Для чтения не нужны ни Qt, ни блокировки SuperApp: читатель только отображает файл
+
+
+class TelemetryReader:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.memory_manager = None
+        self.metrics = None
+        self.version = None
+        self.attach()
+
+    def attach(self):
+        self.close()
+        self.memory_manager = SharedMemoryManager(self.path, attach=True)
+        self.metrics = MetricsRing(self.memory_manager, offset=TelemetryRecord.SIZE, attach=True)
+        self.version = None
+
+    def close(self):
+        if self.memory_manager is not None:
+            self.memory_manager.close()
+            self.memory_manager = None
+
+    def _check(self):
+        # SuperApp перезапущен и создал новый сегмент
+        if self.memory_manager.replaced():
+            self.attach()
+
+    def _read(self, read):
+        self._check()
+        try:
+            return read()
+        except OSError as e:
+            if e.errno != errno.ESTALE:
+                raise
+            # Сегмент заменен, пока читатель ждал завершения записи
+            self.attach()
+            return read()
+
+    def latest(self):
+        return self._read(lambda: TelemetryRecord.unpack(self.memory_manager.read(TelemetryRecord.SIZE)))
+
+    def poll(self):
+        # Новый замер или None, если сегмент не менялся с прошлого вызова
+        self.version, data = self._read(
+            lambda: self.memory_manager.read_if_changed(self.version, TelemetryRecord.SIZE))
+        if data is None:
+            return None
+        return TelemetryRecord.unpack(data)
+
+    def history(self, level, limit):
+        return self._read(lambda: self.metrics.values(level, limit))
+
+
+def main():
+    # Выводит каждый новый замер строкой JSON: python TelemetryReader.py [интервал опроса, с] [путь]
+    interval = float(sys.argv[1]) if len(sys.argv) > 1 else 0.1
+    reader = TelemetryReader(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_PATH)
+    try:
+        while True:
+            try:
+                record = reader.poll()
+            except TimeoutError as e:
+                # Писатель завершился посреди записи; ждем, пока его перезапустят
+                print(e, file=sys.stderr, flush=True)
+                record = None
+            if record is not None:
+                print(json.dumps(vars(record)), flush=True)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import struct
+import time
+
+MAGIC = b'SAPT'
+VERSION = 1
+HEADER = struct.Struct('<4sHxx')
+# Поля записи в порядке размещения и их форматы struct
+FIELDS = (('memory_percent', 'f'), ('app_width', 'I'), ('app_height', 'I'),
+          ('screen_width', 'I'), ('screen_height', 'I'), ('timestamp', 'd'))
+
+
+def field_offsets():
+    # Смещение и формат каждого поля, чтобы читать отдельные поля без разбора всей записи
+    offsets = {}
+    offset = HEADER.size
+    for name, code in FIELDS:
+        offsets[name] = (offset, struct.Struct('<' + code))
+        offset += struct.calcsize(code)
+    return offsets
+
+
+class TelemetryRecord:
+    # Запись фиксированного формата, little-endian: заголовок (magic 4s, version H,
+    # 2 байта выравнивания), затем поля FIELDS. Меняя состав полей, нужно увеличить VERSION
+    FORMAT = struct.Struct(HEADER.format + ''.join(code for _, code in FIELDS))
+    SIZE = FORMAT.size
+    OFFSETS = field_offsets()
+
+    def __init__(self, memory_percent, app_width, app_height, screen_width, screen_height, timestamp=None):
+        self.memory_percent = memory_percent
+        self.app_width = app_width
+        self.app_height = app_height
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    def pack(self):
+        return self.FORMAT.pack(MAGIC, VERSION, *(getattr(self, name) for name, _ in FIELDS))
+
+    @classmethod
+    def is_valid(cls, buffer):
+        # Пустой (еще не записанный) буфер или запись другой версии не читаются
+        magic, version = HEADER.unpack_from(buffer, 0)
+        return magic == MAGIC and version == VERSION
+
+    @classmethod
+    def unpack(cls, buffer):
+        if not cls.is_valid(buffer):
+            return None
+        return cls(*cls.FORMAT.unpack_from(buffer, 0)[2:])
+
+    @classmethod
+    def field(cls, buffer, name):
+        if not cls.is_valid(buffer):
+            return None
+        offset, field_format = cls.OFFSETS[name]
+        return field_format.unpack_from(buffer, offset)[0]
@@ -0,0 +1,177 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class TrashJournal:
+    # Журнал корзины: каждая строка файла - JSON-запись "add" или "remove".
+    # В памяти хранится индекс имя в корзине -> запись и суммарный размер
+    def __init__(self, trash_path, journal_path):
+        self.trash_path = trash_path
+        self.journal_path = journal_path
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.total_size = 0
+        self.dead_records = 0
+        # Имена, выданные reserve(), но еще не записанные в журнал
+        self.reserved = set()
+        # Записи, выбранные evict(), объекты которых еще не перенесены из корзины
+        self.evicting = set()
+        self._load()
+        self.journal = open(self.journal_path, 'a', encoding='utf-8')
+
+    def _load(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Недописанная последняя строка после аварийного завершения
+                    continue
+                if record['op'] == 'add':
+                    self._apply_add(record)
+                elif record['op'] == 'remove':
+                    self._apply_remove(record['trash_name'])
+                    self.dead_records += 2
+                elif record['op'] == 'size':
+                    self._apply_size(record['trash_name'], record['size'])
+                    self.dead_records += 1
+        if self.dead_records > len(self.entries):
+            self._compact()
+
+    def _apply_add(self, record):
+        entry = {key: record[key] for key in ('trash_name', 'original_path', 'deleted_at', 'size')}
+        self.entries[entry['trash_name']] = entry
+        self.total_size += entry['size']
+
+    def _apply_remove(self, trash_name):
+        entry = self.entries.pop(trash_name, None)
+        if entry:
+            self.total_size -= entry['size']
+        return entry
+
+    def _apply_size(self, trash_name, size):
+        entry = self.entries.get(trash_name)
+        if entry:
+            self.total_size += size - entry['size']
+            entry['size'] = size
+        return entry
+
+    def _append(self, record):
+        self.journal.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.journal.flush()
+
+    def _compact(self):
+        temporary_path = self.journal_path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(dict(entry, op='add'), ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, self.journal_path)
+        self.dead_records = 0
+        logging.info(f"Журнал корзины сжат: {len(self.entries)} записей")
+
+    def unique_name(self, original_path):
+        name = os.path.basename(original_path)
+        stem, extension = os.path.splitext(name)
+        candidate = name
+        number = 1
+        while (candidate in self.entries or candidate in self.reserved
+               or os.path.lexists(os.path.join(self.trash_path, candidate))):
+            candidate = f"{stem} ({number}){extension}"
+            number += 1
+        return candidate
+
+    def reserve(self, original_path):
+        # Возвращает уникальный путь в корзине. В журнал удаление записывается через add()
+        # только после успешного перемещения, иначе резерв снимается через release()
+        with self.lock:
+            trash_name = self.unique_name(original_path)
+            self.reserved.add(trash_name)
+        return os.path.join(self.trash_path, trash_name)
+
+    def release(self, trash_path):
+        with self.lock:
+            self.reserved.discard(os.path.basename(trash_path))
+
+    def add(self, original_path, size, trash_path):
+        trash_name = os.path.basename(trash_path)
+        with self.lock:
+            self.reserved.discard(trash_name)
+            record = {'op': 'add', 'trash_name': trash_name, 'original_path': original_path,
+                      'deleted_at': time.time(), 'size': size}
+            self._append(record)
+            self._apply_add(record)
+        return trash_name
+
+    def update_size(self, trash_name, size):
+        # Размер папки, измеренный уже после перемещения в корзину
+        with self.lock:
+            if self._apply_size(trash_name, size):
+                self._append({'op': 'size', 'trash_name': trash_name, 'size': size})
+                self.dead_records += 1
+
+    def remove(self, trash_name):
+        with self.lock:
+            self.evicting.discard(trash_name)
+            entry = self._apply_remove(trash_name)
+            if entry:
+                self._append({'op': 'remove', 'trash_name': trash_name})
+                self.dead_records += 2
+                if self.dead_records > max(len(self.entries), 1000):
+                    self.journal.close()
+                    self._compact()
+                    self.journal = open(self.journal_path, 'a', encoding='utf-8')
+        return entry
+
+    def evict(self, quota, keep=()):
+        # Выбирает самые старые записи, пока корзина без них не уложится в квоту.
+        # Записи из keep (только что удаленные объекты) не вытесняются никогда.
+        # Журнал не меняется: запись снимается через remove() только после того, как объект
+        # убран из корзины, а при неудаче возвращается в расчет через cancel_eviction().
+        # Использует только накопленные итоги, файлы корзины не читаются
+        evicted = []
+        now = time.time()
+        with self.lock:
+            total_size = self.total_size - sum(self.entries[name]['size'] for name in self.evicting)
+            for entry in self.entries.values():
+                if entry['trash_name'] in keep or entry['trash_name'] in self.evicting:
+                    continue
+                if not quota.exceeded(entry, total_size, now):
+                    break
+                total_size -= entry['size']
+                evicted.append(dict(entry))
+            self.evicting.update(entry['trash_name'] for entry in evicted)
+        return evicted
+
+    def cancel_eviction(self, trash_name):
+        with self.lock:
+            self.evicting.discard(trash_name)
+
+    def get(self, trash_name):
+        with self.lock:
+            return self.entries.get(trash_name)
+
+    def listing(self):
+        # Записи от старых к новым и суммарный размер, без обращения к файлам корзины
+        with self.lock:
+            return list(self.entries.values()), self.total_size
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.evicting.clear()
+            self.total_size = 0
+            self.journal.close()
+            self._compact()
+            self.journal = open(self.journal_path, 'a', encoding='utf-8')
+
+    def close(self):
+        with self.lock:
+            self.journal.close()
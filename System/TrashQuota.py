@@ -0,0 +1,18 @@
+import time
+
+
+class TrashQuota:
+    # Ограничение корзины по суммарному размеру и/или возрасту; None - без ограничения
+    def __init__(self, max_bytes=None, max_age=None):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def fits(self, size):
+        # Объект больше всей квоты не может храниться в корзине
+        return self.max_bytes is None or size <= self.max_bytes
+
+    def exceeded(self, entry, total_size, now=None):
+        now = now or time.time()
+        if self.max_bytes is not None and total_size > self.max_bytes:
+            return True
+        return self.max_age is not None and now - entry['deleted_at'] > self.max_age
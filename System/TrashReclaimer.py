@@ -0,0 +1,134 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from TreeWalker import TreeWalker
+
+UNLINK_BATCH_SIZE = 256
+
+
+def lower_thread_priority():
+    # На Linux nice применяется к отдельному потоку
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (AttributeError, OSError):
+        pass
+
+
+class TrashReclaimer(QObject):
+    # Освобождено байт, удалено файлов, затрачено секунд
+    reclaimed = pyqtSignal(int, int, float)
+
+    def __init__(self, staging_path, max_workers=4, parent=None):
+        super().__init__(parent)
+        self.staging_path = staging_path
+        self.max_workers = max_workers
+        self.walker = TreeWalker(max_workers=2)
+        self.stopped = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='trash-reclaim',
+                                           initializer=lower_thread_priority)
+
+    def stage(self, path):
+        # Мгновенно убирает path в скрытую папку на той же файловой системе
+        os.makedirs(self.staging_path, exist_ok=True)
+        staged = os.path.join(self.staging_path, f'{time.time_ns()}-{os.path.basename(path)}')
+        os.rename(path, staged)
+        return staged
+
+    def reclaim(self, path):
+        self.executor.submit(self._reclaim, path)
+
+    def evict(self, paths, staged=None):
+        # Вытеснение из корзины целиком выполняется в фоновом потоке. staged(path, error)
+        # вызывается в нем же после попытки убрать каждый объект; error - None при успехе
+        self.executor.submit(self._evict, paths, staged or (lambda path, error: None))
+
+    def _evict(self, paths, staged):
+        for path in paths:
+            if self.stopped.is_set():
+                return
+            try:
+                staged_path = self.stage(path)
+            except OSError as e:
+                logging.error(f"Не удалось вытеснить {path} из корзины: {e}")
+                staged(path, e)
+                continue
+            staged(path, None)
+            self._reclaim(staged_path)
+
+    def resume(self):
+        # Дочищает то, что не успело удалиться до прошлого выхода из программы
+        if os.path.isdir(self.staging_path):
+            with os.scandir(self.staging_path) as entries:
+                for entry in entries:
+                    self.reclaim(entry.path)
+
+    def stop(self):
+        # Незавершенная очистка продолжится при следующем запуске через resume()
+        self.stopped.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _reclaim(self, path):
+        started = time.monotonic()
+        freed = 0
+        removed = 0
+        directories = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='trash-unlink',
+                                    initializer=lower_thread_priority) as unlinkers:
+                futures = []
+                batch = []
+                if os.path.isdir(path) and not os.path.islink(path):
+                    directories.append(path)
+                    for entry in self.walker.walk(path):
+                        if self.stopped.is_set():
+                            break
+                        if entry.is_dir(follow_symlinks=False):
+                            directories.append(entry.path)
+                            continue
+                        try:
+                            freed += entry.stat(follow_symlinks=False).st_size
+                        except OSError:
+                            pass
+                        batch.append(entry.path)
+                        if len(batch) >= UNLINK_BATCH_SIZE:
+                            futures.append(unlinkers.submit(self._unlink, batch))
+                            batch = []
+                else:
+                    freed += os.lstat(path).st_size
+                    batch.append(path)
+                if batch:
+                    futures.append(unlinkers.submit(self._unlink, batch))
+                for future in futures:
+                    removed += future.result()
+            if self.stopped.is_set():
+                logging.info(f"Очистка {path} прервана, будет продолжена при следующем запуске")
+                return
+            # Папки удаляются от самых глубоких к корню
+            for directory in sorted(directories, key=lambda d: d.count(os.sep), reverse=True):
+                try:
+                    os.rmdir(directory)
+                except OSError as e:
+                    logging.error(f"Не удалось удалить папку {directory}: {e}")
+        except OSError as e:
+            logging.error(f"Ошибка очистки {path}: {e}")
+        elapsed = time.monotonic() - started
+        logging.info(f"Корзина очищена: {path}, освобождено {freed} байт, {removed} файлов "
+                     f"за {elapsed:.2f} с ({removed / max(elapsed, 1e-6):.0f} файлов/с)")
+        self.reclaimed.emit(freed, removed, elapsed)
+
+    def _unlink(self, paths):
+        removed = 0
+        for path in paths:
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.error(f"Не удалось удалить {path}: {e}")
+        return removed
@@ -38,7 +38,11 @@ class TreeView(QTreeView):
         if self.dragged_item:
             drag = QDrag(self)
             mime_data = QMimeData()
-            urls = [QUrl.fromLocalFile(self.dragged_item)]
+            # Перетаскивается все выделение, кроме системных папок
+            paths = {self.model().filePath(index) for index in self.selectionModel().selectedRows(0)}
+            paths.add(self.dragged_item)
+            urls = [QUrl.fromLocalFile(path) for path in sorted(paths)
+                    if os.path.basename(path).lower() not in ("корзина", "system")]
             mime_data.setUrls(urls)
             drag.setMimeData(mime_data)
             drag.exec_(Qt.CopyAction | Qt.MoveAction)
@@ -0,0 +1,75 @@
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Сколько найденных, но еще не прочитанных папок обходчик копит в ширину
+MAX_PENDING_DIRS = 1024
+
+
+class TreeWalker:
+    def __init__(self, max_workers=8, follow_symlinks=False, max_pending=MAX_PENDING_DIRS):
+        self.max_workers = max_workers
+        self.follow_symlinks = follow_symlinks
+        self.max_pending = max_pending
+
+    def walk(self, root):
+        # Генератор DirEntry для всех элементов под root. Подпапки сканируются
+        # параллельно, одновременно в работе не больше 2 * max_workers папок.
+        # Пока очередь папок не длиннее max_pending, обход идет в ширину; на широком дереве
+        # он переходит в глубину, и очередь растет с глубиной дерева, а не с его шириной
+        pending_dirs = deque([root])
+        running = set()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='tree-walk')
+        try:
+            while pending_dirs or running:
+                while pending_dirs and len(running) < self.max_workers * 2:
+                    path = pending_dirs.pop() if len(pending_dirs) > self.max_pending else pending_dirs.popleft()
+                    running.add(executor.submit(self._scan, path))
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for entry in future.result():
+                        if self._is_dir(entry):
+                            pending_dirs.append(entry.path)
+                        yield entry
+        finally:
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def files(self, root):
+        for entry in self.walk(root):
+            if self._is_file(entry):
+                yield entry
+
+    def size(self, root):
+        # Возвращает (суммарный размер, количество файлов), используя stat из DirEntry
+        total_size = 0
+        total_count = 0
+        for entry in self.files(root):
+            try:
+                total_size += entry.stat().st_size
+                total_count += 1
+            except OSError:
+                pass
+        return total_size, total_count
+
+    def _scan(self, path):
+        try:
+            with os.scandir(path) as entries:
+                return list(entries)
+        except OSError as e:
+            logging.warning(f"Не удалось прочитать папку {path}: {e}")
+            return []
+
+    def _is_dir(self, entry):
+        try:
+            return entry.is_dir(follow_symlinks=self.follow_symlinks)
+        except OSError:
+            return False
+
+    def _is_file(self, entry):
+        try:
+            return entry.is_file()
+        except OSError:
+            return False
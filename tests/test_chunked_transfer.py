@@ -0,0 +1,120 @@
+import os
+
+import pytest
+
+from ChunkedTransfer import ChunkedTransfer, part_path
+
+CHUNK = 64 * 1024
+
+
+class Pulled(OSError):
+    pass
+
+
+def make_source(tmp_path, size=10 * CHUNK + 123):
+    source = tmp_path / 'source.bin'
+    source.write_bytes(os.urandom(size))
+    return source
+
+
+def interrupt_after(limit):
+    done = [0]
+
+    def progress(nbytes, nfiles):
+        done[0] += nbytes
+        if done[0] >= limit:
+            raise Pulled(5, 'устройство извлечено')
+    return progress
+
+
+def test_copy_without_interruption(tmp_path):
+    source = make_source(tmp_path)
+    transfer = ChunkedTransfer(str(tmp_path / 'journals'), chunk_size=CHUNK)
+    target = tmp_path / 'device' / 'source.bin'
+    target.parent.mkdir()
+    transfer.copy_file(str(source), str(target))
+    assert target.read_bytes() == source.read_bytes()
+    assert os.listdir(tmp_path / 'device') == ['source.bin']
+    assert transfer.pending(str(tmp_path / 'device')) == []
+
+
+def test_resume_after_interruption(tmp_path):
+    source = make_source(tmp_path)
+    transfer = ChunkedTransfer(str(tmp_path / 'journals'), chunk_size=CHUNK)
+    device = tmp_path / 'device'
+    device.mkdir()
+    target = str(device / 'source.bin')
+    with pytest.raises(Pulled):
+        transfer.copy_file(str(source), target, interrupt_after(4 * CHUNK))
+    assert not os.path.exists(target)
+    assert transfer.pending(str(device)) == [(str(source), target)]
+    # Журнал хранится вне папки устройства
+    assert os.listdir(device) == [os.path.basename(part_path(target))]
+
+    resumed = []
+    transfer.copy_file(str(source), target, lambda nbytes, nfiles: resumed.append(nbytes))
+    assert resumed[0] == 4 * CHUNK
+    assert open(target, 'rb').read() == source.read_bytes()
+    assert transfer.pending(str(device)) == []
+
+
+def test_resume_skips_corrupted_last_chunk(tmp_path):
+    source = make_source(tmp_path)
+    transfer = ChunkedTransfer(str(tmp_path / 'journals'), chunk_size=CHUNK)
+    target = str(tmp_path / 'source.bin')
+    with pytest.raises(Pulled):
+        transfer.copy_file(str(source), target, interrupt_after(5 * CHUNK))
+    with open(part_path(target), 'r+b') as part:
+        part.seek(4 * CHUNK + 10)
+        part.write(b'XX')
+
+    resumed = []
+    transfer.copy_file(str(source), target, lambda nbytes, nfiles: resumed.append(nbytes))
+    assert resumed[0] == 4 * CHUNK
+    assert open(target, 'rb').read() == source.read_bytes()
+
+
+def test_changed_source_restarts(tmp_path):
+    source = make_source(tmp_path)
+    transfer = ChunkedTransfer(str(tmp_path / 'journals'), chunk_size=CHUNK)
+    target = str(tmp_path / 'target.bin')
+    with pytest.raises(Pulled):
+        transfer.copy_file(str(source), target, interrupt_after(3 * CHUNK))
+    source.write_bytes(os.urandom(3 * CHUNK))
+
+    resumed = []
+    transfer.copy_file(str(source), target, lambda nbytes, nfiles: resumed.append(nbytes))
+    assert resumed[0] == CHUNK
+    assert open(target, 'rb').read() == source.read_bytes()
+
+
+def test_data_and_journal_are_synced_per_batch(tmp_path, monkeypatch):
+    source = make_source(tmp_path)
+    transfer = ChunkedTransfer(str(tmp_path / 'journals'), chunk_size=CHUNK, sync_chunks=4)
+    synced = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, 'fsync', lambda fd: synced.append(fd) or fsync(fd))
+    transfer.copy_file(str(source), str(tmp_path / 'target.bin'))
+    # Заголовок журнала и 11 блоков: пачки после 4-го и 8-го блока и в конце,
+    # по fsync данных и журнала на каждую
+    assert len(synced) == 7
+
+
+def test_resume_detects_source_changed_in_place(tmp_path):
+    source = make_source(tmp_path)
+    transfer = ChunkedTransfer(str(tmp_path / 'journals'), chunk_size=CHUNK)
+    target = str(tmp_path / 'target.bin')
+    with pytest.raises(Pulled):
+        transfer.copy_file(str(source), target, interrupt_after(3 * CHUNK))
+    # Те же размер и время изменения, но другое начало файла
+    stat = source.stat()
+    with open(source, 'r+b') as f:
+        f.write(b'changed')
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    with pytest.raises(OSError):
+        transfer.copy_file(str(source), target)
+    assert not os.path.exists(target)
+    assert transfer.pending(str(tmp_path)) == []
+    transfer.copy_file(str(source), target)
+    assert open(target, 'rb').read() == source.read_bytes()
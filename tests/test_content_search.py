@@ -0,0 +1,39 @@
+import threading
+from concurrent.futures import Future
+
+from ContentSearch import ContentSearch, search_file
+
+
+class ManualExecutor:
+    # Первая задача выполняется сразу, остальные остаются в очереди
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, function, *args):
+        future = Future()
+        if not self.futures:
+            future.set_result(function(*args))
+        self.futures.append(future)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def test_search_file_reports_line_numbers(tmp_path):
+    path = tmp_path / 'notes.txt'
+    path.write_text('first\nneedle here\nthird\nneedle again\n')
+    assert search_file(str(path), b'needle', 4) == [
+        (str(path), 2, 'needle here'), (str(path), 4, 'needle again')]
+
+
+def test_closing_search_cancels_pending_batches(tmp_path):
+    for number in range(4):
+        (tmp_path / f'{number}.txt').write_bytes(b'needle\n' + b'x' * (2 * 1024 * 1024))
+    search = ContentSearch(max_workers=1, memory_limit=1024 ** 3)
+    search.executor = ManualExecutor()
+    results = search.search(str(tmp_path), 'needle', threading.Event())
+    next(results)
+    results.close()
+    assert len(search.executor.futures) == 4
+    assert all(future.cancelled() for future in search.executor.futures[1:])
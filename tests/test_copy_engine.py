@@ -0,0 +1,86 @@
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+from CopyEngine import CopyEngine
+
+
+def test_copy_file(tmp_path):
+    source = tmp_path / 'source.txt'
+    source.write_bytes(b'x' * 100000)
+    CopyEngine().copy_file(str(source), str(tmp_path / 'target.txt'))
+    assert (tmp_path / 'target.txt').read_bytes() == source.read_bytes()
+
+
+def test_copy_file_onto_itself_keeps_source(tmp_path):
+    source = tmp_path / 'report.txt'
+    source.write_bytes(b'report')
+    with pytest.raises(shutil.SameFileError):
+        CopyEngine().copy_file(str(source), str(source))
+    assert source.read_bytes() == b'report'
+
+
+def test_copy_file_onto_hard_link_keeps_source(tmp_path):
+    source = tmp_path / 'report.txt'
+    source.write_bytes(b'report')
+    os.link(source, tmp_path / 'link.txt')
+    with pytest.raises(shutil.SameFileError):
+        CopyEngine().copy_file(str(source), str(tmp_path / 'link.txt'), verify=True)
+    assert source.read_bytes() == b'report'
+
+
+def test_copy_tree(tmp_path):
+    source = tmp_path / 'A'
+    (source / 'b').mkdir(parents=True)
+    (source / 'b' / 'c.txt').write_bytes(b'c')
+    (source / 'd.txt').write_bytes(b'd')
+    CopyEngine(max_workers=2).copy_tree(str(source), str(tmp_path / 'B'))
+    assert (tmp_path / 'B' / 'b' / 'c.txt').read_bytes() == b'c'
+    assert (tmp_path / 'B' / 'd.txt').read_bytes() == b'd'
+
+
+def test_copy_tree_into_itself_is_rejected(tmp_path):
+    source = tmp_path / 'A'
+    source.mkdir()
+    (source / 'file.txt').write_bytes(b'data')
+    with pytest.raises(OSError):
+        CopyEngine().copy_tree(str(source), str(source / 'A'))
+    assert sorted(os.listdir(source)) == ['file.txt']
+
+
+def test_copy_many_copies_files_folders_and_links(tmp_path):
+    sources = tmp_path / 'sources'
+    (sources / 'folder').mkdir(parents=True)
+    (sources / 'folder' / 'inner.txt').write_bytes(b'inner')
+    (sources / 'a.txt').write_bytes(b'a')
+    os.symlink('a.txt', sources / 'link')
+    target = tmp_path / 'target'
+    target.mkdir()
+    names = ['folder', 'a.txt', 'link']
+    CopyEngine().copy_many([(str(sources / name), str(target / name)) for name in names])
+    assert (target / 'folder' / 'inner.txt').read_bytes() == b'inner'
+    assert (target / 'a.txt').read_bytes() == b'a'
+    assert os.readlink(target / 'link') == 'a.txt'
+
+
+def test_copy_many_uses_the_pool_for_files(tmp_path):
+    engine = CopyEngine(max_workers=4)
+    threads = set()
+    copy_file = engine.copy_file
+
+    def recording_copy(*args):
+        threads.add(threading.current_thread().name)
+        time.sleep(0.02)
+        return copy_file(*args)
+
+    engine.copy_file = recording_copy
+    pairs = []
+    for number in range(8):
+        (tmp_path / f'{number}.txt').write_bytes(b'x')
+        pairs.append((str(tmp_path / f'{number}.txt'), str(tmp_path / f'{number}.copy')))
+    engine.copy_many(pairs)
+    assert len(threads) > 1
+    assert all((tmp_path / f'{number}.copy').exists() for number in range(8))
@@ -0,0 +1,98 @@
+import threading
+import time
+
+from DirectorySizeIndex import DirectorySizeIndex
+
+
+def make_tree(tmp_path):
+    root = tmp_path / 'root'
+    (root / 'a' / 'b').mkdir(parents=True)
+    (root / 'top.bin').write_bytes(b'x' * 100)
+    (root / 'a' / 'b' / 'deep.bin').write_bytes(b'x' * 400)
+    return root
+
+
+def test_aggregate(tmp_path):
+    root = make_tree(tmp_path)
+    index = DirectorySizeIndex(str(tmp_path / 'sizes.db'))
+    assert index.aggregate(str(root)) == (500, 2)
+    assert index.lookup(str(root / 'a')) == (400, 1)
+    index.close()
+
+
+def test_refresh_propagates_to_ancestors(tmp_path):
+    root = make_tree(tmp_path)
+    index = DirectorySizeIndex(str(tmp_path / 'sizes.db'))
+    index.aggregate(str(root))
+    (root / 'a' / 'b' / 'new.bin').write_bytes(b'x' * 1000)
+    assert index.refresh(str(root / 'a' / 'b')) == (1000, 1)
+    assert index.lookup(str(root)) == (1500, 3)
+    (root / 'a' / 'b' / 'new.bin').unlink()
+    assert index.refresh(str(root / 'a' / 'b')) == (-1000, -1)
+    assert index.lookup(str(root)) == (500, 2)
+    index.close()
+
+
+def test_concurrent_refresh_counts_change_once(tmp_path):
+    root = make_tree(tmp_path)
+    index = DirectorySizeIndex(str(tmp_path / 'sizes.db'))
+    index.aggregate(str(root))
+    (root / 'a' / 'b' / 'new.bin').write_bytes(b'x' * 1000)
+    scan = index._scan
+
+    def slow_scan(path):
+        # Расширяет окно между чтением строки и записью разницы
+        result = scan(path)
+        time.sleep(0.05)
+        return result
+
+    index._scan = slow_scan
+    barrier = threading.Barrier(8)
+
+    def refresh():
+        barrier.wait()
+        index.refresh(str(root / 'a' / 'b'))
+
+    threads = [threading.Thread(target=refresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert index.lookup(str(root)) == (1500, 3)
+    assert index.lookup(str(root / 'a')) == (1400, 2)
+    index.close()
+
+
+def test_cold_scan_does_not_block_refresh(tmp_path):
+    root = make_tree(tmp_path)
+    cold = tmp_path / 'cold'
+    for number in range(3):
+        (cold / f'd{number}').mkdir(parents=True)
+    index = DirectorySizeIndex(str(tmp_path / 'sizes.db'))
+    index.aggregate(str(root))
+    scanning = threading.Event()
+    release = threading.Event()
+    scan = index._scan
+
+    def blocking_scan(path):
+        if path.startswith(str(cold)):
+            scanning.set()
+            release.wait(5)
+        return scan(path)
+
+    index._scan = blocking_scan
+    aggregate = threading.Thread(target=index.aggregate, args=(str(cold),))
+    aggregate.start()
+    assert scanning.wait(5)
+    (root / 'a' / 'b' / 'new.bin').write_bytes(b'x' * 1000)
+    refresh = threading.Thread(target=index.refresh, args=(str(root / 'a' / 'b'),))
+    refresh.start()
+    refresh.join(2)
+    finished = not refresh.is_alive()
+    release.set()
+    aggregate.join()
+    refresh.join()
+    assert finished
+    assert index.lookup(str(root)) == (1500, 3)
+    assert index.lookup(str(cold)) == (0, 0)
+    index.close()
@@ -0,0 +1,42 @@
+import os
+import threading
+
+from DuplicateFinder import DuplicateFinder, PARTIAL_BLOCK_SIZE
+
+
+def find(root):
+    finder = DuplicateFinder(max_workers=2)
+    try:
+        return sorted(path for path, _ in finder.search(str(root), threading.Event()))
+    finally:
+        finder.close()
+
+
+def test_full_hash_separates_files_with_equal_edges(tmp_path):
+    size = 4 * PARTIAL_BLOCK_SIZE
+    data = os.urandom(size)
+    (tmp_path / 'a.bin').write_bytes(data)
+    (tmp_path / 'b.bin').write_bytes(data)
+    # Те же первый и последний блоки и размер, но другая середина
+    middle = bytearray(data)
+    middle[size // 2] ^= 0xFF
+    (tmp_path / 'c.bin').write_bytes(bytes(middle))
+    (tmp_path / 'd.bin').write_bytes(data + b'x')
+    assert find(tmp_path) == [str(tmp_path / 'a.bin'), str(tmp_path / 'b.bin')]
+
+
+def test_small_files_are_grouped_by_partial_hash(tmp_path):
+    (tmp_path / 'a.txt').write_bytes(b'same')
+    (tmp_path / 'b.txt').write_bytes(b'same')
+    (tmp_path / 'c.txt').write_bytes(b'diff')
+    assert find(tmp_path) == [str(tmp_path / 'a.txt'), str(tmp_path / 'b.txt')]
+
+
+def test_hard_links_and_symlinks_are_not_duplicates(tmp_path):
+    (tmp_path / 'a.txt').write_bytes(b'data')
+    os.link(tmp_path / 'a.txt', tmp_path / 'hard.txt')
+    os.symlink(tmp_path / 'a.txt', tmp_path / 'soft.txt')
+    assert find(tmp_path) == []
+    by_size = DuplicateFinder().group_by_size(str(tmp_path), threading.Event())
+    assert sorted(path for paths in by_size.values() for path in paths) in (
+        [str(tmp_path / 'a.txt')], [str(tmp_path / 'hard.txt')])
@@ -0,0 +1,14 @@
+from FileMapping import FileMapping
+
+
+def test_attached_mapping_remaps_read_only(tmp_path):
+    path = str(tmp_path / 'segment')
+    writer = FileMapping(path, 8, header=b'abcd')
+    reader = FileMapping(path, create=False)
+    writer.resize(16)
+    writer.write(b'tail', 12)
+    reader.remap()
+    assert reader.size == 16
+    assert reader.read(4, 12) == b'tail'
+    reader.close()
+    writer.close()
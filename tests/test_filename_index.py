@@ -0,0 +1,63 @@
+import os
+
+from FilenameIndex import FilenameIndex
+
+
+def build(root):
+    index = FilenameIndex()
+    index.build(str(root))
+    index.ready.wait(5)
+    return index
+
+
+def drain(index):
+    index.executor.submit(lambda: None).result()
+
+
+def test_search_substring_and_glob(tmp_path):
+    (tmp_path / 'docs').mkdir()
+    (tmp_path / 'docs' / 'report_2024.txt').write_text('')
+    (tmp_path / 'notes.md').write_text('')
+    index = build(tmp_path)
+    assert index.search('report') == [str(tmp_path / 'docs' / 'report_2024.txt')]
+    assert index.search('*.md') == [str(tmp_path / 'notes.md')]
+
+
+def test_update_adds_and_removes(tmp_path):
+    index = build(tmp_path)
+    (tmp_path / 'fresh.txt').write_text('')
+    index.update(str(tmp_path / 'fresh.txt'))
+    drain(index)
+    assert index.search('fresh') == [str(tmp_path / 'fresh.txt')]
+    os.remove(tmp_path / 'fresh.txt')
+    index.update(str(tmp_path / 'fresh.txt'))
+    drain(index)
+    assert index.search('fresh') == []
+
+
+def test_remove_prunes_recreated_directory(tmp_path):
+    trash = tmp_path / 'trash'
+    trash.mkdir()
+    (trash / 'report_old.txt').write_text('')
+    index = build(tmp_path)
+    os.rename(trash, tmp_path / 'staged')
+    trash.mkdir()
+    index.ignored.append(str(tmp_path / 'staged'))
+    index.remove(str(trash))
+    index.update(str(trash))
+    drain(index)
+    assert index.search('report_old') == []
+    assert index.search('trash') == [str(trash)]
+
+
+def test_remove_tree_keeps_siblings_with_same_prefix(tmp_path):
+    (tmp_path / 'photos' / 'trip').mkdir(parents=True)
+    (tmp_path / 'photos' / 'trip' / 'beach.jpg').write_text('')
+    (tmp_path / 'photos2').mkdir()
+    (tmp_path / 'photos2' / 'beach_copy.jpg').write_text('')
+    index = build(tmp_path)
+    index.remove(str(tmp_path / 'photos'))
+    drain(index)
+    assert index.search('beach') == [str(tmp_path / 'photos2' / 'beach_copy.jpg')]
+    assert index.search('photos') == [str(tmp_path / 'photos2')]
+    assert str(tmp_path / 'photos' / 'trip') not in index.children
@@ -0,0 +1,55 @@
+from MetricsRing import MetricsRing, TIERS
+from SharedMemoryManager import SharedMemoryManager
+
+
+def ring(tmp_path):
+    manager = SharedMemoryManager(str(tmp_path / 'telemetry'), MetricsRing.size())
+    return manager, MetricsRing(manager)
+
+
+def test_values_round_trip_through_attached_reader(tmp_path):
+    manager, metrics = ring(tmp_path)
+    for second in range(5):
+        metrics.append(1000.0 + second, float(second))
+    reader = SharedMemoryManager(str(tmp_path / 'telemetry'), attach=True)
+    try:
+        assert MetricsRing(reader, attach=True).values(0, 3) == [2.0, 3.0, 4.0]
+    finally:
+        reader.close()
+        manager.close()
+
+
+def test_second_tier_fills_gaps_between_idle_samples(tmp_path):
+    manager, metrics = ring(tmp_path)
+    metrics.append(1000.0, 10.0)
+    metrics.append(1010.0, 20.0)
+    assert metrics.values(0, 100) == [10.0] * 10 + [20.0]
+    manager.close()
+
+
+def test_second_tier_keeps_one_sample_per_second(tmp_path):
+    manager, metrics = ring(tmp_path)
+    metrics.append(1000.2, 10.0)
+    metrics.append(1000.7, 30.0)
+    metrics.append(1001.1, 40.0)
+    assert metrics.values(0, 100) == [30.0, 40.0]
+    manager.close()
+
+
+def test_coarse_tiers_average_closed_intervals(tmp_path):
+    manager, metrics = ring(tmp_path)
+    for second in range(25):
+        metrics.append(1000.0 + second, float(second))
+    assert metrics.values(1, 10) == [4.5, 14.5]
+    manager.close()
+
+
+def test_ring_wraps_at_capacity(tmp_path):
+    manager, metrics = ring(tmp_path)
+    capacity = TIERS[0][1]
+    metrics.append(0.0, 1.0)
+    metrics.append(capacity * 3.0, 2.0)
+    values = metrics.values(0, capacity * 2)
+    assert len(values) == capacity
+    assert values[-1] == 2.0 and values[:-1] == [1.0] * (capacity - 1)
+    manager.close()
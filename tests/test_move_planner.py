@@ -0,0 +1,41 @@
+import pytest
+
+from MovePlanner import MovePlanner
+
+
+def test_move_renames_on_same_device(tmp_path):
+    (tmp_path / 'a.txt').write_text('a')
+    (tmp_path / 'target').mkdir()
+    assert MovePlanner().move(str(tmp_path / 'a.txt'), str(tmp_path / 'target' / 'a.txt')) == 'rename'
+    assert (tmp_path / 'target' / 'a.txt').read_text() == 'a'
+
+
+def test_move_does_not_replace_existing_file(tmp_path):
+    (tmp_path / 'a.txt').write_text('new')
+    (tmp_path / 'target').mkdir()
+    (tmp_path / 'target' / 'a.txt').write_text('old')
+    with pytest.raises(FileExistsError):
+        MovePlanner().move(str(tmp_path / 'a.txt'), str(tmp_path / 'target' / 'a.txt'))
+    assert (tmp_path / 'target' / 'a.txt').read_text() == 'old'
+    assert (tmp_path / 'a.txt').exists()
+
+
+def test_move_does_not_merge_into_existing_folder(tmp_path):
+    (tmp_path / 'folder').mkdir()
+    (tmp_path / 'folder' / 'new.txt').write_text('new')
+    (tmp_path / 'target' / 'folder').mkdir(parents=True)
+    (tmp_path / 'target' / 'folder' / 'old.txt').write_text('old')
+    with pytest.raises(FileExistsError):
+        MovePlanner().move(str(tmp_path / 'folder'), str(tmp_path / 'target' / 'folder'))
+    assert [path.name for path in (tmp_path / 'target' / 'folder').iterdir()] == ['old.txt']
+
+
+def test_set_aside_frees_the_target_name(tmp_path):
+    (tmp_path / 'a.txt').write_text('new')
+    (tmp_path / 'target').mkdir()
+    (tmp_path / 'target' / 'a.txt').write_text('old')
+    planner = MovePlanner()
+    aside = planner.set_aside(str(tmp_path / 'target' / 'a.txt'))
+    planner.move(str(tmp_path / 'a.txt'), str(tmp_path / 'target' / 'a.txt'))
+    assert (tmp_path / 'target' / 'a.txt').read_text() == 'new'
+    assert open(aside).read() == 'old'
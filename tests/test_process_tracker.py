@@ -0,0 +1,92 @@
+import importlib
+import sys
+import types
+
+import pytest
+
+pytest.importorskip('PyQt5')
+
+
+class NoSuchProcess(Exception):
+    pass
+
+
+class AccessDenied(Exception):
+    pass
+
+
+class ZombieProcess(NoSuchProcess):
+    pass
+
+
+class FakeProcess:
+    def __init__(self, table, pid):
+        if pid not in table:
+            raise NoSuchProcess(pid)
+        self.table = table
+        self.pid = pid
+        self.identity = table[pid]
+
+    def oneshot(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def name(self):
+        if self.identity[0] is None:
+            raise AccessDenied(self.pid)
+        return self.identity[0]
+
+    def create_time(self):
+        return self.identity[1]
+
+    def is_running(self):
+        return self.table.get(self.pid) == self.identity
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    # pid -> (имя или None без доступа, время создания)
+    table = {}
+    psutil = types.SimpleNamespace(pids=lambda: list(table), Process=lambda pid: FakeProcess(table, pid),
+                                   NoSuchProcess=NoSuchProcess, AccessDenied=AccessDenied,
+                                   ZombieProcess=ZombieProcess)
+    monkeypatch.setitem(sys.modules, 'psutil', psutil)
+    monkeypatch.delitem(sys.modules, 'ProcessTracker', raising=False)
+    tracker = importlib.import_module('ProcessTracker').ProcessTracker()
+    tracker.excluded = set()
+    return tracker, table
+
+
+def test_refresh_reports_added_and_removed(tracker):
+    tracker, table = tracker
+    table.update({10: ('init', 1.0), 20: ('shell', 2.0)})
+    assert tracker.refresh() == ([(10, 'init', 1.0), (20, 'shell', 2.0)], [])
+    del table[20]
+    table[30] = ('editor', 3.0)
+    assert tracker.refresh() == ([(30, 'editor', 3.0)], [20])
+    assert tracker.refresh() == ([], [])
+
+
+def test_inaccessible_process_is_cached_with_partial_info(tracker):
+    tracker, table = tracker
+    table[40] = (None, 4.0)
+    assert tracker.refresh() == ([(40, None, 4.0)], [])
+    assert tracker.refresh() == ([], [])
+    assert tracker.snapshot() == [(40, None, 4.0)]
+
+
+def test_verify_reports_reused_pid(tracker):
+    tracker, table = tracker
+    table[50] = ('old', 5.0)
+    tracker.refresh()
+    table[50] = ('new', 6.0)
+    # Список pid не изменился, поэтому фоновое обновление повторного использования не видит
+    assert tracker.refresh() == ([], [])
+    assert tracker.verify() == ([(50, 'new', 6.0)], [50])
+    assert tracker.snapshot() == [(50, 'new', 6.0)]
+    assert tracker.verify() == ([], [])
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from RefreshScheduler import RefreshScheduler
+
+
+class RecordingModel:
+    def __init__(self):
+        self.calls = []
+
+    def refreshPaths(self, paths, recursive=()):
+        self.calls.append((paths, set(recursive)))
+
+
+def test_paths_under_scheduled_ancestor_are_merged():
+    model = RecordingModel()
+    scheduler = RefreshScheduler(model)
+    root = os.path.join(os.sep, 'data', 'photos')
+    scheduler.enqueue([os.path.join(root, 'trip', 'a.jpg'), root, os.path.join(root, 'b.jpg')])
+    scheduler.enqueue([os.path.join(os.sep, 'data', 'photos2'), root])
+    scheduler.flush()
+    assert model.calls == [([root, os.path.join(os.sep, 'data', 'photos2')], {root})]
+    assert scheduler.requested == 5
+    assert scheduler.refreshed == 2
+    assert scheduler.coalesced == 3
+    assert scheduler.batches == 1
+
+
+def test_flush_without_paths_does_nothing():
+    model = RecordingModel()
+    scheduler = RefreshScheduler(model)
+    scheduler.flush()
+    assert model.calls == []
+    assert scheduler.batches == 0
+
+
+def test_schedule_normalizes_paths():
+    model = RecordingModel()
+    scheduler = RefreshScheduler(model)
+    scheduler.schedule([os.path.join(os.sep, 'data', 'photos', '')])
+    scheduler.flush()
+    assert model.calls == [([os.path.join(os.sep, 'data', 'photos')], set())]
@@ -0,0 +1,52 @@
+import errno
+
+import pytest
+
+import SharedMemoryManager as shared_memory
+from SharedMemoryManager import SEQUENCE, SEQUENCE_OFFSET, SharedMemoryManager
+
+
+def stall(manager):
+    # Счетчик остается нечетным, как после писателя, завершившегося посреди записи
+    SEQUENCE.pack_into(manager.file_mapping.mmap, SEQUENCE_OFFSET, manager.version() + 1)
+
+
+def test_read_returns_written_data(tmp_path):
+    manager = SharedMemoryManager(str(tmp_path / 'segment'), 8)
+    manager.write(b'abcd', 2)
+    assert manager.read(4, 2) == b'abcd'
+    assert manager.read_with(4, 2, bytes) == b'abcd'
+    manager.close()
+
+
+def test_read_gives_up_on_unfinished_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_memory, 'READ_TIMEOUT', 0.01)
+    manager = SharedMemoryManager(str(tmp_path / 'segment'), 8)
+    stall(manager)
+    with pytest.raises(TimeoutError):
+        manager.read(4)
+    with pytest.raises(TimeoutError):
+        manager.read_with(4, 0, bytes)
+    manager.close()
+
+
+def test_read_reports_replaced_segment(tmp_path):
+    path = str(tmp_path / 'segment')
+    writer = SharedMemoryManager(path, 8)
+    reader = SharedMemoryManager(path, attach=True)
+    stall(writer)
+    SharedMemoryManager(path, 8).close()
+    with pytest.raises(OSError) as error:
+        reader.read(4)
+    assert error.value.errno == errno.ESTALE
+    reader.close()
+    writer.close()
+
+
+def test_failed_write_leaves_sequence_even(tmp_path):
+    manager = SharedMemoryManager(str(tmp_path / 'segment'), 8)
+    with pytest.raises((IndexError, ValueError)):
+        manager.write_many([(0, b'ab'), (manager.file_mapping.size, b'cd')])
+    assert manager.version() % 2 == 0
+    assert manager.read(2) == b'ab'
+    manager.close()
@@ -0,0 +1,26 @@
+import struct
+
+from TelemetryRecord import TelemetryRecord
+
+
+def test_pack_unpack_round_trip():
+    record = TelemetryRecord(42.5, 800, 600, 1920, 1080, timestamp=1700000000.25)
+    data = record.pack()
+    assert len(data) == TelemetryRecord.SIZE
+    assert vars(TelemetryRecord.unpack(data)) == vars(record)
+
+
+def test_field_reads_single_value_at_its_offset():
+    data = TelemetryRecord(42.5, 800, 600, 1920, 1080, timestamp=1700000000.25).pack()
+    assert TelemetryRecord.field(data, 'screen_height') == 1080
+    assert TelemetryRecord.field(data, 'timestamp') == 1700000000.25
+    offset, _ = TelemetryRecord.OFFSETS['timestamp']
+    assert struct.unpack_from('<d', data, offset)[0] == 1700000000.25
+
+
+def test_unwritten_or_foreign_buffer_is_rejected():
+    assert TelemetryRecord.unpack(bytes(TelemetryRecord.SIZE)) is None
+    data = bytearray(TelemetryRecord(1.0, 1, 1, 1, 1).pack())
+    data[4] += 1
+    assert TelemetryRecord.unpack(data) is None
+    assert TelemetryRecord.field(data, 'app_width') is None
@@ -0,0 +1,107 @@
+import time
+
+from TrashJournal import TrashJournal
+from TrashQuota import TrashQuota
+
+
+def make_journal(tmp_path):
+    trash = tmp_path / 'trash'
+    trash.mkdir()
+    return TrashJournal(str(trash), str(tmp_path / 'journal'))
+
+
+def trash(journal, original_path, size):
+    return journal.add(original_path, size, journal.reserve(original_path))
+
+
+def test_entries_survive_reopen(tmp_path):
+    journal = make_journal(tmp_path)
+    trash(journal, '/data/a.txt', 10)
+    trash(journal, '/data/b.txt', 20)
+    journal.remove('a.txt')
+    journal.close()
+    reopened = TrashJournal(str(tmp_path / 'trash'), str(tmp_path / 'journal'))
+    entries, total = reopened.listing()
+    assert [entry['trash_name'] for entry in entries] == ['b.txt']
+    assert total == 20
+
+
+def test_unique_names(tmp_path):
+    journal = make_journal(tmp_path)
+    first = journal.reserve('/one/a.txt')
+    second = journal.reserve('/two/a.txt')
+    assert first.endswith('a.txt')
+    assert second.endswith('a (1).txt')
+    journal.release(first)
+    assert journal.reserve('/three/a.txt') == first
+
+
+def test_size_update_survives_reopen(tmp_path):
+    journal = make_journal(tmp_path)
+    trash(journal, '/data/folder', 0)
+    journal.update_size('folder', 300)
+    assert journal.total_size == 300
+    journal.close()
+    reopened = TrashJournal(str(tmp_path / 'trash'), str(tmp_path / 'journal'))
+    assert reopened.get('folder')['size'] == 300
+    assert reopened.total_size == 300
+
+
+def test_evict_oldest_until_within_quota(tmp_path):
+    journal = make_journal(tmp_path)
+    for number in range(5):
+        trash(journal, f'/data/{number}', 10)
+    evicted = journal.evict(TrashQuota(max_bytes=25))
+    assert [entry['trash_name'] for entry in evicted] == ['0', '1', '2']
+    # Записи снимаются только после того, как объекты убраны из корзины
+    assert journal.total_size == 50
+    for entry in evicted:
+        journal.remove(entry['trash_name'])
+    assert journal.total_size == 20
+
+
+def test_pending_eviction_is_not_chosen_twice(tmp_path):
+    journal = make_journal(tmp_path)
+    for number in range(3):
+        trash(journal, f'/data/{number}', 10)
+    quota = TrashQuota(max_bytes=15)
+    assert [entry['trash_name'] for entry in journal.evict(quota)] == ['0', '1']
+    assert journal.evict(quota) == []
+    # Объект не удалось убрать: он снова учитывается и будет выбран при следующей проверке
+    journal.cancel_eviction('1')
+    assert [entry['trash_name'] for entry in journal.evict(quota)] == ['1']
+
+
+def test_unstaged_eviction_survives_reopen(tmp_path):
+    journal = make_journal(tmp_path)
+    trash(journal, '/data/old', 10)
+    trash(journal, '/data/new', 10)
+    assert [entry['trash_name'] for entry in journal.evict(TrashQuota(max_bytes=10))] == ['old']
+    journal.close()
+    reopened = TrashJournal(str(tmp_path / 'trash'), str(tmp_path / 'journal'))
+    assert reopened.get('old') is not None
+    assert reopened.total_size == 20
+
+
+def test_evict_never_takes_kept_entry(tmp_path):
+    journal = make_journal(tmp_path)
+    trash(journal, '/data/old', 5)
+    trash(journal, '/data/new', 15)
+    evicted = journal.evict(TrashQuota(max_bytes=10), keep=['new'])
+    assert [entry['trash_name'] for entry in evicted] == ['old']
+    assert journal.get('new') is not None
+
+
+def test_evict_by_age(tmp_path):
+    journal = make_journal(tmp_path)
+    trash(journal, '/data/old', 1)
+    journal.entries['old']['deleted_at'] = time.time() - 100
+    trash(journal, '/data/new', 1)
+    evicted = journal.evict(TrashQuota(max_age=50))
+    assert [entry['trash_name'] for entry in evicted] == ['old']
+
+
+def test_quota_fits():
+    assert TrashQuota(max_bytes=10).fits(10)
+    assert not TrashQuota(max_bytes=10).fits(11)
+    assert TrashQuota().fits(10 ** 12)
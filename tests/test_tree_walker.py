@@ -0,0 +1,52 @@
+import os
+import threading
+
+from TreeWalker import TreeWalker
+
+
+def make_wide_tree(root, width):
+    for first in range(width):
+        for second in range(width):
+            (root / f'd{first}' / f'd{second}').mkdir(parents=True)
+        (root / f'd{first}' / 'file.txt').write_bytes(b'x' * 10)
+
+
+def test_walk_yields_every_entry_after_its_folder(tmp_path):
+    make_wide_tree(tmp_path, 5)
+    seen = set()
+    for entry in TreeWalker(max_workers=2, max_pending=3).walk(str(tmp_path)):
+        assert os.path.dirname(entry.path) == str(tmp_path) or os.path.dirname(entry.path) in seen
+        seen.add(entry.path)
+    assert len(seen) == 5 + 5 * 5 + 5
+
+
+def test_size_counts_files(tmp_path):
+    make_wide_tree(tmp_path, 3)
+    assert TreeWalker().size(str(tmp_path)) == (30, 3)
+
+
+def test_pending_folders_stay_bounded_on_wide_tree(tmp_path):
+    make_wide_tree(tmp_path, 30)
+    walker = TreeWalker(max_workers=2, max_pending=16)
+    lock = threading.Lock()
+    scanned = [0]
+    scan = walker._scan
+
+    def counting_scan(path):
+        with lock:
+            scanned[0] += 1
+        return scan(path)
+
+    walker._scan = counting_scan
+    # Найденные папки, которые еще не начали читаться
+    found = 1
+    peak = 0
+    for entry in walker.walk(str(tmp_path)):
+        if entry.is_dir():
+            found += 1
+            with lock:
+                peak = max(peak, found - scanned[0])
+    assert found == 1 + 30 + 30 * 30
+    # В ширину в очереди оказались бы все 900 папок второго уровня; при обходе в глубину
+    # к порогу добавляются только подпапки папок, прочитанных за один шаг
+    assert peak <= 16 + (walker.max_workers * 2 + 1) * 30